@@ -1,25 +1,53 @@
 import argparse
 import asyncio
+import json
 from colorama import Fore, Style, init
 import sys
+from collections import Counter
 
-# Import modules
-from modules.email_breach import check_email_breach
-from modules.username import search_usernames
-from modules.email_recon import search_email_registrations
-from modules.phone import check_phone_number
-from modules.domain import analyze_domain
+# Import modules. Lookups and the network libraries behind them (aiohttp, dnspython, phonenumbers...)
+# are imported by the registry or by the command that needs them, so startup stays cheap
+from modules.registry import registry, discover, TARGET_MODULES
+from modules.variants import generate_variants, DEFAULT_MAX_VARIANTS
+from modules.batch import run_batch
+from modules import shard
+from modules.result_cache import ResultCache
+from modules.journal import Journal
+from modules.metrics import metrics
+from modules.models import records_from_result, EmailDomainResult, PasswordResult, SubdomainResult, TLSResult, DKIMResult
+from modules.output import ResultWriter, FORMATS, infer_format
+from modules.render import render, render_tls, describe_key
+from modules.settings import settings, get_settings, SettingsError, CONFIG_PATH
 
-def _print_and_save_output(content_lines, output_file_path=None):
-    """Prints content to console and optionally saves to a file, stripping color codes."""
+def _print_and_save_output(content_lines, writer=None, records=()):
+    """Prints content to console and optionally streams it to the writer (text lines or structured records)."""
     for line in content_lines:
         print(line)
-    
-    if output_file_path:
-        with open(output_file_path, 'a') as f:
-            # Strip color codes before writing to file
-            clean_lines = [line.replace(Fore.GREEN, '').replace(Fore.RED, '').replace(Fore.YELLOW, '').replace(Fore.CYAN, '').replace(Fore.WHITE, '').replace(Style.RESET_ALL, '') for line in content_lines]
-            f.write("\n".join(clean_lines) + "\n")
+
+    if writer:
+        writer.write_lines(content_lines)
+        writer.write_records(records)
+
+def _structured_format(args):
+    # Non-interactive commands always write records; plain text only suits the menu
+    fmt = args.format or infer_format(args.output)
+    return 'jsonl' if fmt == 'text' else fmt
+
+def _report(output_content, module, target, result, writer, journal=None):
+    records = records_from_result(module, target, result)
+    output_content.extend(render(module, target, records))
+    _print_and_save_output(output_content, writer, records)
+    if journal:
+        # Finished targets are probed afresh next time; the journal only covers interrupted work
+        journal.mark_done(module, target)
+
+def _finish_metrics(args):
+    if args.metrics:
+        metrics.write(args.metrics)
+        print(f"[*] Probe metrics written to {args.metrics}.", file=sys.stderr)
+    if args.profile:
+        for line in metrics.profile():
+            print(line, file=sys.stderr)
 
 def display_banner():
     banner = f"""
@@ -37,14 +65,512 @@ oo     .d8P  .8'     `888.   888  `88b.   888
 """
     print(banner)
 
+def _parse_modules(value):
+    if not value:
+        return None
+    modules = {m.strip() for m in value.split(',') if m.strip()}
+    known = {m for names in TARGET_MODULES.values() for m in names}
+    unknown = modules - known
+    if unknown:
+        sys.exit(f"Unknown module(s): {', '.join(sorted(unknown))}")
+    return modules
+
+def run_batch_command(args):
+    modules = _parse_modules(args.modules)
+    if args.workers > 1 or args.job_dir:
+        run_sharded_batch(args, modules)
+        return
+
+    cache = None if args.no_cache else ResultCache.from_config(refresh=args.refresh)
+    journal = Journal(args.journal) if args.journal else None
+    input_stream = sys.stdin if args.input == '-' else open(args.input)
+    # Batch output is always structured; text is only for the interactive menu
+    writer = ResultWriter(args.output, _structured_format(args))
+    try:
+        stats = asyncio.run(run_batch(input_stream, writer, args.concurrency, modules, cache, journal))
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        writer.close()
+        if cache:
+            cache.close()
+        if journal:
+            journal.close()
+    print(f"[*] Batch finished: {stats['ok']} succeeded, {stats['failed']} failed.", file=sys.stderr)
+    dns_stats = stats['dns_cache']
+    print(f"[*] DNS cache: {dns_stats['hits']} hits, {dns_stats['misses']} misses, {dns_stats['evictions']} evictions.", file=sys.stderr)
+    if 'result_cache' in stats:
+        result_stats = stats['result_cache']
+        print(f"[*] Result cache: {result_stats['hits']} results served from cache, {result_stats['misses']} looked up"
+              + (f", {result_stats['errors']} reads or writes failed." if result_stats['errors'] else "."), file=sys.stderr)
+    if 'journal' in stats:
+        journal_stats = stats['journal']
+        print(f"[*] Journal: {stats['resumed']} targets already written, {journal_stats['replayed']} probes replayed, {journal_stats['recorded']} recorded.", file=sys.stderr)
+    _finish_metrics(args)
+
+def run_sharded_batch(args, modules):
+    input_stream = sys.stdin if args.input == '-' else open(args.input)
+    writer = ResultWriter(args.output, _structured_format(args))
+    try:
+        counts = shard.run_sharded(input_stream, writer, args.workers, args.concurrency, modules,
+                                   use_cache=not args.no_cache, refresh=args.refresh, job_dir=args.job_dir,
+                                   chunk_size=args.chunk_size)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        writer.close()
+    print(f"[*] Sharded batch finished: {counts['done']} chunks across {args.workers} workers.", file=sys.stderr)
+
+def run_queue_command(args):
+    if args.action == 'init':
+        input_stream = sys.stdin if args.input == '-' else open(args.input)
+        with input_stream:
+            try:
+                chunks = shard.init_queue(args.job_dir, input_stream, args.chunk_size)
+            except FileExistsError as e:
+                sys.exit(f"[!] {e}")
+        print(f"[*] Queued {chunks} chunks in {args.job_dir}.", file=sys.stderr)
+    elif args.action == 'work':
+        shard.requeue_stale(args.job_dir, args.stale_after)
+        processed = shard.work(args.job_dir, args.concurrency, _parse_modules(args.modules),
+                               use_cache=not args.no_cache, refresh=args.refresh)
+        print(f"[*] Worker finished: {processed} chunks processed.", file=sys.stderr)
+    elif args.action == 'merge':
+        with ResultWriter(args.output, _structured_format(args)) as writer:
+            merged = shard.merge(args.job_dir, writer)
+        print(f"[*] Merged {merged} new chunks.", file=sys.stderr)
+    else:
+        counts = shard.status(args.job_dir)
+        print(f"[*] {counts['pending']} pending, {counts['claimed']} claimed, {counts['done']} done, {counts['merged']} merged.")
+
+def run_bench_command(args):
+    # Imported here so the mock servers only load when benchmarking
+    from modules.bench import run_benchmarks, print_results, FarmProfile, BENCH_MODULES
+    modules = [m.strip() for m in args.modules.split(',')] if args.modules else list(BENCH_MODULES)
+    unknown = set(modules) - set(BENCH_MODULES)
+    if unknown:
+        sys.exit(f"Unknown module(s): {', '.join(sorted(unknown))}")
+    profile = FarmProfile(latency=args.latency, jitter=args.jitter, body_bytes=args.body_bytes,
+                          throttle_rate=args.throttle_rate, timeout_rate=args.timeout_rate)
+    results = run_benchmarks(modules, args.targets, args.concurrency, profile, args.host_rate)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+def run_startup_command(args):
+    # Imported here like bench: the report is a maintenance tool, not part of a normal run
+    from modules.startup import measure_startup, print_report, find_regressions, DEFAULT_REPEAT
+    if args.all:
+        modules = discover()
+    elif args.modules:
+        modules = [f"modules.{m.strip()}" for m in args.modules.split(',') if m.strip()]
+    else:
+        modules = None
+    try:
+        report = measure_startup(modules, args.repeat or DEFAULT_REPEAT)
+    except RuntimeError as e:
+        sys.exit(f"[!] {e}")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f))
+        for line in regressions:
+            print(f"{Fore.RED}{line}{Style.RESET_ALL}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"[*] No import-time regressions against {args.baseline}.", file=sys.stderr)
+
+def run_breaches_command(args):
+    email_breach = registry.load("email_breach")
+    from modules.http_client import close_session
+    input_stream = sys.stdin if args.input == '-' else open(args.input)
+    with input_stream:
+        lines = [line.strip() for line in input_stream if line.strip()]
+    writer = ResultWriter(args.output, _structured_format(args))
+
+    async def run():
+        try:
+            if args.passwords:
+                for candidate, count in (await email_breach.check_pwned_passwords(lines)).items():
+                    writer.write_record(PasswordResult(email_breach.sha1_hex(candidate), count))
+            else:
+                def on_result(email, result):
+                    writer.write_records(records_from_result("email_breach", email, result))
+                await email_breach.check_email_breaches(lines, on_result)
+        finally:
+            await close_session()
+
+    try:
+        asyncio.run(run())
+    finally:
+        writer.close()
+
+def run_emails_command(args):
+    from modules.email_triage import triage_emails, email_domain, DEAD_VERDICTS
+    from modules.http_client import close_session
+    email_recon = registry.load("email_recon")
+    input_stream = sys.stdin if args.input == '-' else open(args.input)
+    with input_stream:
+        emails = list(dict.fromkeys(line.strip().lower() for line in input_stream if line.strip()))
+    writer = ResultWriter(args.output, _structured_format(args))
+    skip = () if args.probe_all else DEAD_VERDICTS + (('disposable',) if args.skip_disposable else ())
+    concurrency = args.concurrency or get_settings().batch_concurrency
+
+    async def run():
+        try:
+            # One DNS triage per domain before any per-site probe
+            reports = await triage_emails(emails, on_result=lambda report: writer.write_record(EmailDomainResult.from_report(report)))
+            verdicts = Counter(report['verdict'] for report in reports.values())
+            print(f"[*] {len(emails)} addresses across {len(reports)} domains: "
+                  + ", ".join(f"{count} {verdict}" for verdict, count in verdicts.most_common()) + ".", file=sys.stderr)
+            targets = [email for email in emails if reports[email_domain(email)]['verdict'] not in skip]
+            if args.triage_only:
+                return
+            print(f"[*] Probing {len(targets)} addresses, skipping {len(emails) - len(targets)} on {'/'.join(skip) or 'no'} domains.", file=sys.stderr)
+            queue = asyncio.Queue()
+            for email in targets:
+                queue.put_nowait(email)
+
+            async def worker():
+                while not queue.empty():
+                    email = queue.get_nowait()
+                    writer.write_records(records_from_result("email_recon", email, await email_recon.search_email_registrations(email)))
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, len(targets)) or 1)))
+        finally:
+            await close_session()
+
+    try:
+        asyncio.run(run())
+    finally:
+        writer.close()
+
+def _cached_lookup(cache, module, target, lookup):
+    """Returns a stored result for (module, target) if still fresh, otherwise runs lookup() and stores it."""
+    if cache is None:
+        return lookup()
+    cached, result = cache.get(module, target)
+    if cached:
+        print(f"{Fore.CYAN}[*] Using cached {module} result for {target} (--refresh to query again).{Style.RESET_ALL}")
+        return result
+    result = lookup()
+    cache.put(module, target, result)
+    return result
+
+def run_subdomains_command(args):
+    from modules.subdomain import enumerate_subdomains, print_progress, DEFAULT_QPS, DEFAULT_CONCURRENCY
+    init(autoreset=True)
+    writer = ResultWriter(args.output, args.format) if args.output else None
+
+    def on_found(subdomain, addresses):
+        _print_and_save_output([f"{Fore.GREEN}[+] {subdomain}{Style.RESET_ALL} ({', '.join(addresses)})"],
+                               writer, [SubdomainResult(args.domain, subdomain, addresses)])
+
+    _print_and_save_output([f"[*] Enumerating subdomains for {Fore.CYAN}{args.domain}{Style.RESET_ALL} from {args.wordlist}..."])
+    try:
+        found = asyncio.run(enumerate_subdomains(args.domain, args.wordlist, qps=DEFAULT_QPS if args.qps is None else args.qps,
+                                                 concurrency=args.concurrency or DEFAULT_CONCURRENCY,
+                                                 nameservers=args.nameserver, on_found=on_found, progress=print_progress))
+    finally:
+        if writer:
+            writer.close()
+    _print_and_save_output([f"[*] Found {len(found)} subdomains for {args.domain}."])
+
+def run_tls_command(args):
+    from modules.tls_scan import scan_hosts
+    init(autoreset=True)
+    input_stream = sys.stdin if args.input == '-' else open(args.input)
+    with input_stream:
+        hosts = [line.strip() for line in input_stream if line.strip() and not line.startswith('#')]
+    writer = ResultWriter(args.output, args.format) if args.output else None
+
+    def on_result(report):
+        _print_and_save_output(render_tls(report), writer, [TLSResult.from_report(report)])
+
+    try:
+        reports = asyncio.run(scan_hosts(hosts, args.port, args.concurrency, args.budget, args.timeout, on_result))
+    finally:
+        if writer:
+            writer.close()
+    reachable = sum(1 for report in reports if not report['error'])
+    print(f"[*] Scanned {len(reports)} hosts, {reachable} answered TLS.", file=sys.stderr)
+
+def run_dkim_command(args):
+    from modules.dkim import discover_dkim, DEFAULT_CONCURRENCY
+    init(autoreset=True)
+    writer = ResultWriter(args.output, args.format) if args.output else None
+    found = 0
+
+    def on_found(domain, key):
+        nonlocal found
+        found += 1
+        _print_and_save_output([f"{Fore.GREEN}[+] {domain}{Style.RESET_ALL} {describe_key(key)}"],
+                               writer, [DKIMResult(domain, **key)])
+
+    async def run():
+        for domain in args.domains:
+            report = await discover_dkim(domain, args.selectors, thorough=not args.quick, exhaustive=args.all,
+                                         qps=args.qps, concurrency=args.concurrency or DEFAULT_CONCURRENCY,
+                                         on_found=lambda key: on_found(domain, key))
+            hinted = f", provider hinted by MX/SPF: {', '.join(report['hinted'])}" if report['hinted'] else ""
+            print(f"[*] {domain}: {report['checked']} selectors in {report['elapsed']:.1f}s, {len(report['keys'])} keys"
+                  f"{', stopped once the provider was identified' if report['stopped_early'] else ''}{hinted}.",
+                  file=sys.stderr)
+            if report['wildcard']:
+                print(f"{Fore.YELLOW}[!] {domain} answers every selector; the key is a wildcard.{Style.RESET_ALL}", file=sys.stderr)
+
+    try:
+        asyncio.run(run())
+    finally:
+        if writer:
+            writer.close()
+    _finish_metrics(args)
+
+def _parse_years(value):
+    years = []
+    for part in (value or '').split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            years += range(int(first), int(last) + 1)
+        elif part.strip():
+            years.append(int(part))
+    return years
+
+def run_variants_command(args):
+    init(autoreset=True)
+    try:
+        years = _parse_years(args.years)
+    except ValueError:
+        sys.exit(f"Invalid --years: {args.years} (expected e.g. 1990-1995,2001)")
+    variants = generate_variants(args.username, years, leet=not args.no_leet, max_variants=args.max)
+    if args.list:
+        print("\n".join(variants))
+        return
+    writer = ResultWriter(args.output, args.format) if args.output else None
+    journal = Journal(args.journal) if args.journal else None
+
+    def on_result(variant, result):
+        site, url, status = result
+        lines = [f"{Fore.GREEN}[+] {site}: {url}{Style.RESET_ALL} ({variant})"] if status is True else []
+        _print_and_save_output(lines, writer, records_from_result("username", variant, [result]))
+
+    _print_and_save_output([f"[*] Searching {len(variants)} variants of {Fore.CYAN}{args.username}{Style.RESET_ALL}..."])
+    username = registry.load("username")
+    from modules.http_client import close_session
+
+    async def run():
+        try:
+            return await username.search_username_variants(variants, journal=journal, stop_on_hit=not args.all, on_result=on_result)
+        finally:
+            await close_session()
+
+    try:
+        _, stats = asyncio.run(run())
+    finally:
+        if writer:
+            writer.close()
+        if journal:
+            journal.close()
+    _finish_metrics(args)
+    print(f"[*] {stats['variants']} variants x {stats['sites']} sites: {stats['probed']} probed, {stats['hits']} found, "
+          f"{stats['collapsed']} collapsed as duplicate URLs, {stats['skipped']} skipped after a hit.", file=sys.stderr)
+
+def run_phones_command(args):
+    input_stream = sys.stdin if args.input == '-' else open(args.input)
+    with input_stream:
+        numbers = [line for line in input_stream if line.strip() and not line.startswith('#')]
+    writer = ResultWriter(args.output, _structured_format(args))
+    counts = {"numbers": 0, "valid": 0}
+
+    def on_result(number, result):
+        counts["numbers"] += 1
+        counts["valid"] += result["valid"]
+        writer.write_records(records_from_result("phone", number, result))
+
+    phone = registry.load("phone")
+    analyzed = phone.analyze_numbers(numbers, args.region, args.workers)
+    try:
+        if args.mentions:
+            asyncio.run(phone.search_mentions_bulk(analyzed, args.mention_rate, on_result=on_result))
+        else:
+            for number, result in analyzed:
+                on_result(number, result)
+    finally:
+        writer.close()
+    print(f"[*] Analyzed {counts['numbers']} distinct numbers ({len(numbers) - counts['numbers']} duplicates folded), "
+          f"{counts['valid']} valid.", file=sys.stderr)
+
 def main():
     init(autoreset=True)
 
     parser = argparse.ArgumentParser(description="SAKI OSINT - A comprehensive OSINT tool.")
     parser.add_argument('-o', '--output', type=str, help='Output file to save results.')
+    parser.add_argument('-f', '--format', choices=FORMATS, help='Output file format (default: from the file extension, .jsonl/.csv, otherwise text).')
+    parser.add_argument('--refresh', action='store_true', help='Ignore cached results and query everything again.')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the on-disk result cache.')
+    parser.add_argument('--journal', type=str, help='Record finished probes here so an interrupted search resumes where it stopped.')
+    parser.add_argument('--metrics', type=str, help='Write per-phase probe timings here at the end of the run (.json for a JSON summary, otherwise Prometheus text).')
+    parser.add_argument('--profile', action='store_true', help='Print the slowest phases and sites at the end of the run.')
+    parser.add_argument('--config', type=str, default=CONFIG_PATH, help='Settings file, reloaded when it changes during a run (default: config.ini).')
+    subparsers = parser.add_subparsers(dest='command')
+    batch_parser = subparsers.add_parser('batch', help='Run many targets non-interactively, one per line.')
+    batch_parser.add_argument('input', nargs='?', default='-', help='File with targets (default: stdin). Lines may be prefixed with username:, email:, phone: or domain:.')
+    batch_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write results to (default: stdout).')
+    batch_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default=argparse.SUPPRESS, help='Output format (default: from the file extension, otherwise jsonl).')
+    batch_parser.add_argument('-c', '--concurrency', type=int, help='Maximum number of lookups running at once (default: [LIMITS] BATCH_CONCURRENCY, 50).')
+    batch_parser.add_argument('--refresh', action='store_true', default=argparse.SUPPRESS, help='Ignore cached results and query everything again.')
+    batch_parser.add_argument('--no-cache', action='store_true', default=argparse.SUPPRESS, help='Do not read or write the on-disk result cache.')
+    batch_parser.add_argument('-m', '--modules', type=str, help='Comma-separated modules to run (username, email_breach, email_recon, phone, domain).')
+    batch_parser.add_argument('--journal', type=str, default=argparse.SUPPRESS, help='Journal file; re-running with the same journal and output skips everything already done.')
+    batch_parser.add_argument('--metrics', type=str, default=argparse.SUPPRESS, help='Write per-phase probe timings here (.json for a JSON summary, otherwise Prometheus text).')
+    batch_parser.add_argument('--profile', action='store_true', default=argparse.SUPPRESS, help='Print the slowest phases and sites at the end of the run.')
+    batch_parser.add_argument('--config', type=str, default=argparse.SUPPRESS, help='Settings file, reloaded when it changes during the run.')
+    batch_parser.add_argument('-j', '--workers', type=int, default=1, help='Worker processes to split the targets across (default: 1).')
+    batch_parser.add_argument('--job-dir', type=str, help='Keep the work queue here so an interrupted run can be resumed.')
+    batch_parser.add_argument('--chunk-size', type=int, default=shard.DEFAULT_CHUNK_SIZE, help='Targets per work queue chunk.')
+    queue_parser = subparsers.add_parser('queue', help='Share a batch across machines through a work queue on a shared filesystem.')
+    queue_parser.add_argument('action', choices=('init', 'work', 'merge', 'status'), help='init: split targets into chunks; work: process chunks until none are left; merge: write finished results; status: show progress.')
+    queue_parser.add_argument('job_dir', help='Work queue directory.')
+    queue_parser.add_argument('input', nargs='?', default='-', help='Targets to queue for init (default: stdin).')
+    queue_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to merge results into (default: stdout).')
+    queue_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default=argparse.SUPPRESS, help='Merged output format (default: from the file extension, otherwise jsonl).')
+    queue_parser.add_argument('-c', '--concurrency', type=int, help='Maximum number of lookups running at once per worker (default: [LIMITS] BATCH_CONCURRENCY, 50).')
+    queue_parser.add_argument('-m', '--modules', type=str, help='Comma-separated modules to run.')
+    queue_parser.add_argument('--chunk-size', type=int, default=shard.DEFAULT_CHUNK_SIZE, help='Targets per chunk for init.')
+    queue_parser.add_argument('--stale-after', type=int, default=shard.STALE_CLAIM_SECONDS, help='Seconds after which a claimed chunk is assumed abandoned and queued again.')
+    queue_parser.add_argument('--config', type=str, default=argparse.SUPPRESS, help='Settings file, reloaded when it changes during the run.')
+    queue_parser.add_argument('--refresh', action='store_true', default=argparse.SUPPRESS, help='Ignore cached results and query everything again.')
+    queue_parser.add_argument('--no-cache', action='store_true', default=argparse.SUPPRESS, help='Do not read or write the on-disk result cache.')
+    subdomain_parser = subparsers.add_parser('subdomains', help='Brute-force subdomains of a domain from a wordlist.')
+    subdomain_parser.add_argument('domain', help='Domain to enumerate (e.g., example.com).')
+    subdomain_parser.add_argument('-w', '--wordlist', required=True, help='Wordlist file, one label per line.')
+    subdomain_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to append found subdomains to.')
+    subdomain_parser.add_argument('-f', '--format', choices=FORMATS, default=argparse.SUPPRESS, help='Output file format (default: from the file extension, otherwise text).')
+    subdomain_parser.add_argument('--qps', type=float, help='Maximum DNS queries per second (0 for unlimited, default: 200).')
+    subdomain_parser.add_argument('-c', '--concurrency', type=int, help='Maximum number of queries in flight (default: 100).')
+    subdomain_parser.add_argument('-n', '--nameserver', action='append', help='Nameserver to query; repeat to spread load over several.')
+    breach_parser = subparsers.add_parser('breaches', help='Check a list of emails against HIBP at the API rate limit.')
+    breach_parser.add_argument('input', nargs='?', default='-', help='File with one email per line (default: stdin).')
+    breach_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write results to (default: stdout).')
+    breach_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default=argparse.SUPPRESS, help='Output format (default: from the file extension, otherwise jsonl).')
+    breach_parser.add_argument('--passwords', action='store_true', help='Treat input lines as passwords or SHA-1 hashes and check them with the Pwned Passwords range API.')
+    emails_parser = subparsers.add_parser('emails', help='Triage the domains of an email list by DNS, then probe sites for registrations.')
+    emails_parser.add_argument('input', nargs='?', default='-', help='File with one email per line (default: stdin).')
+    emails_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write results to (default: stdout).')
+    emails_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default=argparse.SUPPRESS, help='Output format (default: from the file extension, otherwise jsonl).')
+    emails_parser.add_argument('-c', '--concurrency', type=int, help='Addresses probed at once (default: [LIMITS] BATCH_CONCURRENCY, 50).')
+    emails_parser.add_argument('--triage-only', action='store_true', help='Only report each domain\'s MX/SPF/DMARC triage.')
+    emails_parser.add_argument('--skip-disposable', action='store_true', help='Also skip addresses on throwaway mailbox providers.')
+    emails_parser.add_argument('--probe-all', action='store_true', help='Probe addresses on dead domains too.')
+    tls_parser = subparsers.add_parser('tls', help='Scan many hosts for accepted TLS versions, ciphers and certificates.')
+    tls_parser.add_argument('input', nargs='?', default='-', help='File with one host per line (default: stdin).')
+    tls_parser.add_argument('-p', '--port', type=int, default=443, help='Port to connect to.')
+    tls_parser.add_argument('-c', '--concurrency', type=int, help='Maximum number of handshakes in flight (default: [LIMITS] TLS_CONCURRENCY, 100).')
+    tls_parser.add_argument('--timeout', type=float, help='Seconds allowed per handshake (default: [TIMEOUTS] TLS_HANDSHAKE, 5).')
+    tls_parser.add_argument('--budget', type=float, help='Seconds allowed for the whole scan; later handshakes are skipped.')
+    tls_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write results to.')
+    tls_parser.add_argument('-f', '--format', choices=FORMATS, default=argparse.SUPPRESS, help='Output file format (default: from the file extension, otherwise text).')
+    dkim_parser = subparsers.add_parser('dkim', help='Discover the DKIM keys of domains from a large selector dictionary.')
+    dkim_parser.add_argument('domains', nargs='+', help='Domains to scan (e.g., example.com).')
+    dkim_parser.add_argument('-w', '--selectors', help='Selector wordlist to use instead of the built-in dictionary.')
+    dkim_parser.add_argument('--qps', type=float, help='Maximum DNS queries per second (default: [LIMITS] DKIM_QPS, 200).')
+    dkim_parser.add_argument('-c', '--concurrency', type=int, help='Maximum number of queries in flight (default: 50).')
+    dkim_parser.add_argument('--quick', action='store_true', help='Leave out the date-based selectors.')
+    dkim_parser.add_argument('--all', action='store_true', help='Keep going after a key has identified the mail provider.')
+    dkim_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write found keys to.')
+    dkim_parser.add_argument('-f', '--format', choices=FORMATS, default=argparse.SUPPRESS, help='Output file format (default: from the file extension, otherwise text).')
+    variants_parser = subparsers.add_parser('variants', help='Search sites for separator, case, leetspeak and year variants of a username.')
+    variants_parser.add_argument('username', help='Username to derive the variants from.')
+    variants_parser.add_argument('--years', type=str, help='Years to append, e.g. 1985-1995,2001.')
+    variants_parser.add_argument('--no-leet', action='store_true', help='Leave out leetspeak variants.')
+    variants_parser.add_argument('--max', type=int, default=DEFAULT_MAX_VARIANTS, help='Maximum number of variants, most likely first.')
+    variants_parser.add_argument('--all', action='store_true', help='Keep probing a site after one variant was found on it.')
+    variants_parser.add_argument('--list', action='store_true', help='Only print the variants.')
+    variants_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write results to.')
+    variants_parser.add_argument('-f', '--format', choices=FORMATS, default=argparse.SUPPRESS, help='Output file format (default: from the file extension, otherwise text).')
+    phones_parser = subparsers.add_parser('phones', help='Validate a large list of phone numbers offline, optionally searching for mentions.')
+    phones_parser.add_argument('input', nargs='?', default='-', help='File with one phone number per line (default: stdin).')
+    phones_parser.add_argument('-o', '--output', type=str, default=argparse.SUPPRESS, help='File to write results to (default: stdout).')
+    phones_parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default=argparse.SUPPRESS, help='Output format (default: from the file extension, otherwise jsonl).')
+    phones_parser.add_argument('-j', '--workers', type=int, help='Worker processes for large lists (default: one per CPU).')
+    phones_parser.add_argument('--region', type=str, help='Region code (e.g., US) for numbers written without a +country prefix.')
+    phones_parser.add_argument('--mentions', action='store_true', help='Also search Google for online mentions of each valid number.')
+    phones_parser.add_argument('--mention-rate', type=float, help='Maximum mention searches per minute (default: [LIMITS] MENTIONS_PER_MINUTE, 20).')
+    bench_parser = subparsers.add_parser('bench', help='Benchmark the modules offline against a local mock site farm and stub DNS server.')
+    bench_parser.add_argument('-m', '--modules', type=str, help='Comma-separated modules to benchmark (username, email_recon, domain).')
+    bench_parser.add_argument('-n', '--targets', type=int, default=100, help='Targets per module.')
+    bench_parser.add_argument('-c', '--concurrency', type=int, default=20, help='Targets looked up at once.')
+    bench_parser.add_argument('--latency', type=float, default=0.05, help='Mean mock response latency in seconds.')
+    bench_parser.add_argument('--jitter', type=float, default=0.02, help='Standard deviation of the latency in seconds.')
+    bench_parser.add_argument('--body-bytes', type=int, default=16384, help='Size of mock response bodies.')
+    bench_parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429 and Retry-After.')
+    bench_parser.add_argument('--timeout-rate', type=float, default=0.0, help='Fraction of requests that hang past the probe timeout.')
+    bench_parser.add_argument('--host-rate', type=float, help='Override the per-host request rate (requests/second) to tune concurrency.')
+    bench_parser.add_argument('--json', action='store_true', help='Print the results as JSON, e.g. to compare runs for regressions.')
+    startup_parser = subparsers.add_parser('startup', help='Report startup time and the import cost of each module, measured in fresh interpreters.')
+    startup_parser.add_argument('-m', '--modules', type=str, help='Comma-separated modules to measure (default: the lookup modules).')
+    startup_parser.add_argument('--all', action='store_true', help='Measure every module in the modules directory.')
+    startup_parser.add_argument('-r', '--repeat', type=int, help='Cold runs per measurement; the median is reported (default: 5).')
+    startup_parser.add_argument('--json', action='store_true', help='Print the report as JSON, e.g. to keep as a baseline.')
+    startup_parser.add_argument('--baseline', type=str, help='Earlier --json report; exit with status 1 if anything got notably slower.')
     args = parser.parse_args()
+    try:
+        settings.load(args.config)
+    except SettingsError as e:
+        sys.exit(f"Invalid settings in {args.config}: {e}")
+    # Timing is only collected when something will report it
+    metrics.enabled = bool(args.metrics or args.profile)
+
+    if args.command == 'breaches':
+        run_breaches_command(args)
+        return
+    if args.command == 'batch':
+        if (args.workers > 1 or args.job_dir) and (args.journal or args.metrics or args.profile):
+            # Each worker process journals its own chunks and keeps its own timings
+            batch_parser.error("--journal, --metrics and --profile cannot be combined with --workers or --job-dir; "
+                               "use --job-dir to make a sharded run resumable")
+        run_batch_command(args)
+        return
+    if args.command == 'subdomains':
+        run_subdomains_command(args)
+        return
+    if args.command == 'queue':
+        run_queue_command(args)
+        return
+    if args.command == 'bench':
+        run_bench_command(args)
+        return
+    if args.command == 'startup':
+        run_startup_command(args)
+        return
+    if args.command == 'emails':
+        run_emails_command(args)
+        return
+    if args.command == 'tls':
+        run_tls_command(args)
+        return
+    if args.command == 'variants':
+        run_variants_command(args)
+        return
+    if args.command == 'dkim':
+        run_dkim_command(args)
+        return
+    if args.command == 'phones':
+        run_phones_command(args)
+        return
+
+    cache = None if args.no_cache else ResultCache.from_config(refresh=args.refresh)
+    journal = Journal(args.journal) if args.journal else None
+
+    writer = ResultWriter(args.output, args.format) if args.output else None
 
     display_banner()
+    # One event loop for the whole session instead of one per lookup
+    loop = asyncio.new_event_loop()
 
     while True:
         output_content = []
@@ -61,159 +587,55 @@ def main():
 
         if choice == '1':
             email = input(f"{Fore.YELLOW}Enter email address for breach check: {Style.RESET_ALL}").strip()
-            output_content = []
-            output_content.append(f"[*] Checking for breaches for {Fore.CYAN}{email}{Style.RESET_ALL}...")
-            result = check_email_breach(email)
-
-            if result and "breaches" in result:
-                breaches = result["breaches"]
-                if breaches:
-                    output_content.append(f"{Fore.GREEN}[+] Found {len(breaches)} breaches:{Style.RESET_ALL}")
-                    for breach in breaches:
-                        output_content.append(f"  {Fore.YELLOW}----------------------------------------{Style.RESET_ALL}")
-                        output_content.append(f"  {Fore.RED}Name         : {breach.get('Name')}{Style.RESET_ALL}")
-                        output_content.append(f"  {Fore.WHITE}Domain       : {breach.get('Domain')}")
-                        output_content.append(f"  {Fore.WHITE}Breach Date  : {breach.get('BreachDate')}")
-                        dataclasses = ", ".join(breach.get('DataClasses', []))
-                        output_content.append(f"  {Fore.WHITE}Data Classes : {dataclasses}")
-                else:
-                     output_content.append(f"{Fore.GREEN}[-] No breaches found for {email}.{Style.RESET_ALL}")
-            elif result and "error" in result:
-                output_content.append(f"{Fore.RED}[!] An error occurred: {result['error']}{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.GREEN}[-] No breaches found for {email}.{Style.RESET_ALL}")
-            
-            _print_and_save_output(output_content, args.output)
+            output_content = [f"[*] Checking for breaches for {Fore.CYAN}{email}{Style.RESET_ALL}..."]
+            result = _cached_lookup(cache, "email_breach", email, lambda: registry.load("email_breach").check_email_breach(email))
+            _report(output_content, "email_breach", email, result, writer)
 
         elif choice == '2':
             username = input(f"{Fore.YELLOW}Enter username to search: {Style.RESET_ALL}").strip()
-            output_content = []
-            output_content.append(f"[*] Searching for username: {Fore.CYAN}{username}{Style.RESET_ALL}...")
-            results = asyncio.run(search_usernames(username))
-            
-            found_count = 0
-            for site, url, status in results:
-                if status is True:
-                    output_content.append(f"{Fore.GREEN}[+] {site}: {url}")
-                    found_count += 1
-            if found_count == 0:
-                output_content.append(f"{Fore.RED}[-] No accounts found for {username}.{Style.RESET_ALL}")
-            
-            _print_and_save_output(output_content, args.output)
+            output_content = [f"[*] Searching for username: {Fore.CYAN}{username}{Style.RESET_ALL}..."]
+            results = _cached_lookup(cache, "username", username, lambda: loop.run_until_complete(registry.load("username").search_usernames(username, journal=journal)))
+            _report(output_content, "username", username, results, writer, journal)
 
         elif choice == '3':
             email = input(f"{Fore.YELLOW}Enter email address for registration recon: {Style.RESET_ALL}").strip()
-            output_content = []
-            output_content.append(f"[*] Checking email registrations for {Fore.CYAN}{email}{Style.RESET_ALL}...")
-            results = asyncio.run(search_email_registrations(email))
-            
-            found_count = 0
-            for site, url, status in results:
-                if status is True:
-                    output_content.append(f"{Fore.GREEN}[+] {site}: Registered")
-                    found_count += 1
-                elif status is False:
-                    output_content.append(f"{Fore.RED}[-] {site}: Not Registered")
-                else:
-                    output_content.append(f"{Fore.YELLOW}[?] {site}: {status}")
-            if found_count == 0:
-                output_content.append(f"{Fore.RED}[-] No registrations found for {email}.{Style.RESET_ALL}")
-            
-            _print_and_save_output(output_content, args.output)
+            output_content = [f"[*] Checking email registrations for {Fore.CYAN}{email}{Style.RESET_ALL}..."]
+            results = _cached_lookup(cache, "email_recon", email, lambda: loop.run_until_complete(registry.load("email_recon").search_email_registrations(email, journal=journal)))
+            _report(output_content, "email_recon", email, results, writer, journal)
 
         elif choice == '4':
             phone_number = input(f"{Fore.YELLOW}Enter phone number (e.g., +15551234567): {Style.RESET_ALL}").strip()
-            output_content = []
-            output_content.append(f"[*] Analyzing phone number: {Fore.CYAN}{phone_number}{Style.RESET_ALL}...")
-            results = check_phone_number(phone_number)
-
-            if results["valid"]:
-                output_content.append(f"{Fore.GREEN}[+] Phone number is valid.{Style.RESET_ALL}")
-                output_content.append(f"  {Fore.WHITE}Country Code   : {results['country_code']}")
-                output_content.append(f"  {Fore.WHITE}National Number: {results['national_number']}")
-                if results["carrier"]:
-                    output_content.append(f"  {Fore.WHITE}Carrier        : {results['carrier']}")
-                if results["location"]:
-                    output_content.append(f"  {Fore.WHITE}Location       : {results['location']}")
-                
-                if results["online_mentions"]:
-                    output_content.append(f"{Fore.GREEN}[+] Found online mentions:{Style.RESET_ALL}")
-                    for mention in results["online_mentions"]:
-                        output_content.append(f"  {Fore.CYAN}- {mention}{Style.RESET_ALL}")
-                else:
-                    output_content.append(f"{Fore.YELLOW}[-] No online mentions found.{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.RED}[-] Phone number is invalid or an error occurred: {results.get('error', 'Unknown error')}{Style.RESET_ALL}")
-            
-            _print_and_save_output(output_content, args.output)
+            output_content = [f"[*] Analyzing phone number: {Fore.CYAN}{phone_number}{Style.RESET_ALL}..."]
+            results = _cached_lookup(cache, "phone", phone_number, lambda: registry.load("phone").check_phone_number(phone_number))
+            _report(output_content, "phone", phone_number, results, writer)
 
         elif choice == '5':
             domain = input(f"{Fore.YELLOW}Enter domain name (e.g., example.com): {Style.RESET_ALL}").strip()
-            output_content = []
-            output_content.append(f"[*] Analyzing domain: {Fore.CYAN}{domain}{Style.RESET_ALL}...")
-            results = analyze_domain(domain)
-
-            output_content.append(f"{Fore.GREEN}[+] WHOIS Information:{Style.RESET_ALL}")
-            output_content.append(results["whois"])
-            
-            output_content.append(f"{Fore.GREEN}[+] DNS Information:{Style.RESET_ALL}")
-            for record_type, records in results["dns"].items():
-                if records:
-                    output_content.append(f"  {Fore.WHITE}{record_type} Records:{Style.RESET_ALL}")
-                    for record in records:
-                        output_content.append(f"    {Fore.CYAN}- {record}{Style.RESET_ALL}")
-                else:
-                    output_content.append(f"  {Fore.YELLOW}{record_type} Records: Not Found{Style.RESET_ALL}")
-            
-            output_content.append(f"{Fore.GREEN}[+] Common Subdomains:{Style.RESET_ALL}")
-            if results["subdomains"]:
-                for subdomain in results["subdomains"]:
-                    output_content.append(f"  {Fore.CYAN}- {subdomain}{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.YELLOW}[-] No common subdomains found.{Style.RESET_ALL}")
-
-            output_content.append(f"{Fore.GREEN}[+] SSL/TLS Versions:{Style.RESET_ALL}")
-            if results["ssl_tls_versions"]:
-                for version in results["ssl_tls_versions"]:
-                    output_content.append(f"  {Fore.CYAN}- {version}{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.YELLOW}[-] No SSL/TLS versions found or could not be checked.{Style.RESET_ALL}")
-
-            if results["private_ip_warning"]:
-                output_content.append(f"{Fore.RED}[!] WARNING: Private IP address(es) found in DNS records!{Style.RESET_ALL}")
-
-            output_content.append(f"{Fore.GREEN}[+] Email Authentication Records (SPF, DMARC, DKIM):{Style.RESET_ALL}")
-            if results["dns"].get('SPF'):
-                output_content.append(f"  {Fore.WHITE}SPF Records:{Style.RESET_ALL}")
-                for record in results["dns"]['SPF']:
-                    output_content.append(f"    {Fore.CYAN}- {record}{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.YELLOW}SPF Records: Not Found{Style.RESET_ALL}")
-
-            if results["dns"].get('DMARC'):
-                output_content.append(f"  {Fore.WHITE}DMARC Records:{Style.RESET_ALL}")
-                for record in results["dns"]['DMARC']:
-                    output_content.append(f"    {Fore.CYAN}- {record}{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.YELLOW}DMARC Records: Not Found{Style.RESET_ALL}")
-
-            if results["dns"].get('DKIM'):
-                output_content.append(f"  {Fore.WHITE}DKIM Records:{Style.RESET_ALL}")
-                for record in results["dns"]['DKIM']:
-                    output_content.append(f"    {Fore.CYAN}- {record}{Style.RESET_ALL}")
-            else:
-                output_content.append(f"{Fore.YELLOW}DKIM Records: Not Found{Style.RESET_ALL}")
-            
-            _print_and_save_output(output_content, args.output)
+            output_content = [f"[*] Analyzing domain: {Fore.CYAN}{domain}{Style.RESET_ALL}..."]
+            results = _cached_lookup(cache, "domain", domain, lambda: loop.run_until_complete(registry.load("domain").analyze_domain_async(domain, journal=journal)))
+            _report(output_content, "domain", domain, results, writer, journal)
 
         elif choice == '6':
             output_content.append(f"{Fore.GREEN}Exiting SAKI OSINT. Goodbye!{Style.RESET_ALL}")
-            _print_and_save_output(output_content, args.output)
+            if cache:
+                stats = cache.stats()
+                output_content.append(f"[*] {stats['hits']} results served from cache, {stats['misses']} looked up.")
+                cache.close()
+            _print_and_save_output(output_content, writer)
+            if writer:
+                writer.close()
+            if journal:
+                journal.close()
+            _finish_metrics(args)
+            http_client = registry.loaded("modules.http_client")
+            if http_client: # Only when a lookup opened the pooled session
+                loop.run_until_complete(http_client.close_session())
+            loop.close()
             sys.exit()
 
         else:
             output_content.append(f"{Fore.RED}Invalid choice. Please enter a number between 1 and 6.{Style.RESET_ALL}")
-            _print_and_save_output(output_content, args.output)
+            _print_and_save_output(output_content, writer)
 
 if __name__ == "__main__":
     main()
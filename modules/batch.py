@@ -0,0 +1,137 @@
+import asyncio
+import re
+
+from modules.journal import journaled, WHOLE_TARGET
+from modules.models import records_from_result, ErrorResult
+from modules.registry import registry, TARGET_MODULES
+from modules.settings import get_settings
+from modules.tlds import is_known_tld
+
+PHONE_PATTERN = re.compile(r"^\+[\d\s().-]{7,}$")
+DOMAIN_PATTERN = re.compile(r"^(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+(?:[a-z]{2,}|xn--[a-z0-9-]+)$", re.IGNORECASE)
+
+def _is_phone(value):
+    # Without a region only +country numbers parse, so handles like "1234567" and IPs stay out
+    if not PHONE_PATTERN.match(value):
+        return False
+    import phonenumbers
+    try:
+        return phonenumbers.is_possible_number(phonenumbers.parse(value))
+    except phonenumbers.NumberParseException:
+        return False
+
+def detect_target_type(value):
+    """
+    Guesses the type of an untagged target; anything that is not clearly an email, phone
+    number or domain is searched as a username.
+
+    >>> [detect_target_type(v) for v in ("a@example.com", "+1 415 555 2671", "example.co.uk")]
+    ['email', 'phone', 'domain']
+    >>> [detect_target_type(v) for v in ("john.smith", "j.doe.1990", "192.168.0.1", "1234567", "+123")]
+    ['username', 'username', 'username', 'username', 'username']
+    """
+    if "@" in value:
+        return "email"
+    if _is_phone(value):
+        return "phone"
+    if DOMAIN_PATTERN.match(value) and is_known_tld(value.rsplit(".", 1)[1]):
+        return "domain"
+    return "username"
+
+def parse_target(line):
+    """Parses an input line into (type, value). Lines may be prefixed with 'type:' to skip detection."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    kind, sep, value = line.partition(":")
+    if sep and kind.lower() in TARGET_MODULES:
+        return kind.lower(), value.strip()
+    return detect_target_type(line), line
+
+async def run_module(module, target, journal=None):
+    # Each lookup module is imported the first time a target needs it, and HTTP lookups share
+    # the loop's pooled session, so a phone-only batch never loads aiohttp or dnspython.
+    # Per-site and per-stage modules journal their own units; the others are one unit per target
+    lookup = registry.load(module)
+    if module == "username":
+        return await lookup.search_usernames(target, journal=journal)
+    if module == "email_recon":
+        return await lookup.search_email_registrations(target, journal=journal)
+    if module == "domain":
+        return await lookup.analyze_domain_async(target, verbose=False, journal=journal)
+    if module == "email_breach":
+        # Paced to the HIBP key's rate limit across all workers
+        return await journaled(journal, module, target, WHOLE_TARGET, lambda: lookup.check_email_breach_async(target))
+    if module == "phone":
+        # Mention searches are paced by their own rate limiter across all workers
+        return await journaled(journal, module, target, WHOLE_TARGET, lambda: lookup.check_phone_number_async(target))
+    raise ValueError(f"Unknown module: {module}")
+
+async def _read_targets(stream, queue, modules, concurrency):
+    while True:
+        line = await asyncio.to_thread(stream.readline)
+        if not line:
+            break
+        parsed = parse_target(line)
+        if parsed is None:
+            continue
+        kind, target = parsed
+        for module in TARGET_MODULES[kind]:
+            if modules is None or module in modules:
+                await queue.put((module, target))
+    for _ in range(concurrency):
+        await queue.put(None)
+
+async def _worker(queue, writer, stats, cache, journal):
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        module, target = item
+        if journal and journal.is_done(module, target):
+            stats["resumed"] += 1 # Written to the output by an earlier run
+            continue
+        try:
+            cached, result = cache.get(module, target) if cache else (False, None)
+            if not cached:
+                result = await run_module(module, target, journal)
+                if cache:
+                    cache.put(module, target, result)
+            records = records_from_result(module, target, result)
+            stats["ok"] += 1
+        except Exception as e:
+            writer.write_record(ErrorResult(module, target, str(e)))
+            stats["failed"] += 1
+            continue
+        writer.write_records(records)
+        if journal:
+            # The records must be on disk before the journal says they were written
+            writer.flush()
+            journal.mark_done(module, target)
+
+async def run_batch(stream, writer, concurrency=None, modules=None, cache=None, journal=None):
+    """
+    Runs every target from stream through one event loop, streaming records to `writer` as each lookup finishes.
+    With a journal, targets already written by an earlier run are skipped and finished units are not probed again.
+    """
+    stats = {"ok": 0, "failed": 0, "resumed": 0}
+    concurrency = concurrency or get_settings().batch_concurrency
+    # Bounded so huge inputs are streamed instead of loaded up front
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    try:
+        workers = [asyncio.create_task(_worker(queue, writer, stats, cache, journal)) for _ in range(concurrency)]
+        await _read_targets(stream, queue, modules, concurrency)
+        await asyncio.gather(*workers)
+    finally:
+        # Closes the pooled session the HTTP lookups shared, if any of them ran
+        http_client = registry.loaded("modules.http_client")
+        if http_client:
+            await http_client.close_session()
+    # Not imported just to report on it when no lookup needed DNS
+    resolver = registry.loaded("modules.dns_cache")
+    stats["dns_cache"] = resolver.dns_cache.stats() if resolver else {"hits": 0, "misses": 0, "evictions": 0, "size": 0}
+    if cache:
+        stats["result_cache"] = cache.stats()
+    if journal:
+        stats["journal"] = journal.stats()
+    return stats
@@ -0,0 +1,376 @@
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+
+import dns.asyncresolver
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+from aiohttp import web
+
+from modules.sites import USERNAME_SITES_PATH, EMAIL_SITES_PATH
+
+# Offline benchmark: a local aiohttp "site farm" answers for every site definition and a stub DNS
+# server answers for every domain, so the probing code runs unmodified against predictable services.
+
+BENCH_MODULES = ("username", "email_recon", "domain")
+# Benchmark domains are <name>.test, each its own registrable domain
+BENCH_ZONE = "test"
+DNS_TTL = 300
+# Each site is served from its own loopback address so per-host pacing behaves as it does live
+LOOPBACK_PREFIX = "127.0.1."
+
+@dataclass
+class FarmProfile:
+    """How the mock services behave. Rates are fractions of requests, latencies are seconds."""
+    latency: float = 0.05
+    jitter: float = 0.02
+    body_bytes: int = 16384
+    throttle_rate: float = 0.0
+    retry_after: int = 1
+    timeout_rate: float = 0.0
+    hang: float = 11.0 # Longer than the probes' own request timeout
+    exists_rate: float = 0.3
+    dns_latency: float = 0.002
+    subdomain_hit_rate: float = 0.1
+
+def _exists(key, rate):
+    # Deterministic so every run sees the same answers
+    return zlib.crc32(key.encode()) % 1000 < rate * 1000
+
+class SiteFarm:
+    """aiohttp server emulating every username and email site, with configurable faults."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.counts = {"requests": 0, "throttled": 0, "hung": 0}
+        with open(USERNAME_SITES_PATH) as f:
+            self.username_sites = json.load(f)["sites"]
+        with open(EMAIL_SITES_PATH) as f:
+            self.email_sites = json.load(f)["sites"]
+        self._runner = None
+
+    async def _delay(self):
+        profile = self.profile
+        await asyncio.sleep(max(0.0, random.gauss(profile.latency, profile.jitter)))
+
+    def _fault(self):
+        """Returns a response for an injected fault, or None to answer normally."""
+        roll = random.random()
+        if roll < self.profile.throttle_rate:
+            self.counts["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.profile.retry_after)})
+        if roll < self.profile.throttle_rate + self.profile.timeout_rate:
+            self.counts["hung"] += 1
+            return "hang"
+        return None
+
+    def _body(self, marker):
+        # The marker sits mid-page so streaming scans pay for a realistic amount of reading
+        filler = "x" * max(0, self.profile.body_bytes - len(marker))
+        half = len(filler) // 2
+        return filler[:half] + marker + filler[half:]
+
+    async def handle_username(self, request):
+        self.counts["requests"] += 1
+        await self._delay()
+        fault = self._fault()
+        if fault == "hang":
+            await asyncio.sleep(self.profile.hang)
+        elif fault is not None:
+            return fault
+        site = self.username_sites[int(request.match_info["site"])]
+        target = request.match_info["target"]
+        if "missing" in request.query:
+            return web.Response(text=self._body("")) # The error page missing profiles redirect to
+        exists = _exists(f"{site['name']}:{target}", self.profile.exists_rate)
+        check_type = site.get("check_type", "status_code")
+        if check_type == "message":
+            error_msg = site["error_msg"]
+            marker = "" if exists else (error_msg if isinstance(error_msg, str) else error_msg[0])
+            return web.Response(text=self._body(marker))
+        if check_type == "response_url" and not exists:
+            raise web.HTTPFound(site["error_url"].format(target))
+        return web.Response(text=self._body(""), status=200 if exists else 404)
+
+    async def handle_email(self, request):
+        self.counts["requests"] += 1
+        await self._delay()
+        fault = self._fault()
+        if fault == "hang":
+            await asyncio.sleep(self.profile.hang)
+        elif fault is not None:
+            return fault
+        site = self.email_sites[int(request.match_info["site"])]
+        target = request.query_string + await request.text()
+        # The patterns' own source text matches the literal-ish regexes used by the site definitions
+        marker = site.get("success_regex" if _exists(f"{site['name']}:{target}", self.profile.exists_rate)
+                          else "fail_regex") or ""
+        return web.Response(text=self._body(marker))
+
+    async def handle_rdap(self, request):
+        self.counts["requests"] += 1
+        await self._delay()
+        fault = self._fault()
+        if fault == "hang":
+            await asyncio.sleep(self.profile.hang)
+        elif fault is not None:
+            return fault
+        name = request.match_info["name"]
+        return web.json_response({
+            "objectClassName": "domain",
+            "ldhName": name,
+            "status": ["client transfer prohibited"],
+            "events": [{"eventAction": "registration", "eventDate": "2015-03-01T00:00:00Z"},
+                       {"eventAction": "expiration", "eventDate": "2030-03-01T00:00:00Z"}],
+            "nameservers": [{"ldhName": f"ns1.{name}"}],
+            "entities": [{"roles": ["registrar"], "vcardArray": ["vcard", [["fn", {}, "text", "Bench Registrar"]]]}],
+            "secureDNS": {"delegationSigned": False},
+        }, content_type="application/rdap+json")
+
+    def _host(self, index):
+        return f"{LOOPBACK_PREFIX}{index % 250 + 1}"
+
+    def write_sites(self, port, directory):
+        """Writes copies of the site definitions pointing at the farm; returns their paths."""
+        username_sites = []
+        for index, site in enumerate(self.username_sites):
+            base = f"http://{self._host(index)}:{port}/u/{index}"
+            site = dict(site, url=base + "/{}")
+            if site.get("check_type") == "response_url":
+                site["error_url"] = base + "/{}?missing=1"
+            username_sites.append(site)
+        email_sites = [dict(site, url=f"http://{self._host(index)}:{port}/e/{index}")
+                       for index, site in enumerate(self.email_sites)]
+
+        paths = (os.path.join(directory, "sites_data.json"), os.path.join(directory, "email_recon_sites.json"))
+        for path, sites in zip(paths, (username_sites, email_sites)):
+            with open(path, "w") as f:
+                json.dump({"sites": sites}, f)
+        return paths
+
+    async def start(self):
+        """Listens on one loopback address per site, all on the same port; returns the port."""
+        app = web.Application()
+        app.router.add_route("*", "/u/{site}/{target}", self.handle_username)
+        app.router.add_route("*", "/e/{site}", self.handle_email)
+        app.router.add_get("/rdap/domain/{name}", self.handle_rdap)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        hosts = sorted({self._host(index) for index in range(max(len(self.username_sites), len(self.email_sites)))})
+        await web.TCPSite(self._runner, hosts[0], 0).start()
+        port = self._runner.addresses[0][1]
+        for host in hosts[1:]:
+            await web.TCPSite(self._runner, host, port).start()
+        return port
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+class StubDNS(asyncio.DatagramProtocol):
+    """
+    Authoritative-looking UDP DNS server for BENCH_ZONE. Each <name>.test is a zone with
+    A/MX/NS/TXT(SPF)/SOA records, DMARC and a DKIM key; a fixed share of its subdomains exist.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.queries = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        response = self.answer(query)
+        asyncio.get_running_loop().call_later(self.profile.dns_latency, self.transport.sendto, response.to_wire(), addr)
+
+    def _records(self, name, apex):
+        if name == apex:
+            return {
+                "A": ["127.0.0.1"],
+                "MX": [f"10 mail.{apex}."],
+                "NS": [f"ns1.{apex}."],
+                "TXT": ['"v=spf1 include:_spf.example.net -all"'],
+                "SOA": [f"ns1.{apex}. hostmaster.{apex}. 1 3600 600 86400 300"],
+            }
+        if name == f"_dmarc.{apex}":
+            return {"TXT": ['"v=DMARC1; p=reject; rua=mailto:dmarc@example.net"']}
+        if name == f"default._domainkey.{apex}":
+            return {"TXT": ['"v=DKIM1; k=rsa; p=MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQC"']}
+        if name.startswith("mail.") or _exists(name, self.profile.subdomain_hit_rate):
+            return {"A": ["127.0.0.1"]}
+        return None
+
+    def answer(self, query):
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        question = query.question[0]
+        name = question.name.to_text().rstrip(".").lower()
+        labels = name.split(".")
+        apex = ".".join(labels[-2:])
+        records = self._records(name, apex) if name.endswith("." + BENCH_ZONE) and len(labels) >= 2 else None
+        rtype = dns.rdatatype.to_text(question.rdtype)
+        if records and rtype in records:
+            response.answer.append(dns.rrset.from_text(question.name, DNS_TTL, "IN", rtype, *records[rtype]))
+            return response
+        if records is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        # Negative answers carry the SOA so resolvers can cache them
+        soa = f"ns1.{apex}. hostmaster.{apex}. 1 3600 600 86400 300"
+        response.authority.append(dns.rrset.from_text(apex + ".", DNS_TTL, "IN", "SOA", soa))
+        return response
+
+class MockServices:
+    """Runs the site farm and stub DNS server on a background event loop thread."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.farm = SiteFarm(profile)
+        self.dns = StubDNS(profile)
+        self.directory = tempfile.mkdtemp(prefix="saki-bench-")
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def start(self):
+        self._thread.start()
+        self.http_port = self._call(self.farm.start())
+        self.username_sites_path, self.email_sites_path = self.farm.write_sites(self.http_port, self.directory)
+
+        async def start_dns():
+            transport, _ = await self.loop.create_datagram_endpoint(lambda: self.dns, local_addr=("127.0.0.1", 0))
+            return transport.get_extra_info("sockname")[1]
+        self.dns_port = self._call(start_dns())
+        return self
+
+    def stop(self):
+        self._call(self.farm.stop())
+        self.dns.transport.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+async def _run_client(module, count, concurrency, services, host_rate):
+    from modules.domain import analyze_domain_async
+    from modules.email_recon import search_email_registrations
+    from modules.http_client import get_session, close_session
+    from modules.ratelimit import HostScheduler, set_scheduler
+    from modules.sites import load_username_sites, load_email_sites
+    from modules.username import search_usernames
+    from modules.whois_client import whois_client
+
+    if host_rate:
+        set_scheduler(HostScheduler(host_rate=host_rate))
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = ["127.0.0.1"]
+    resolver.port = services["dns_port"]
+    dns.asyncresolver.default_resolver = resolver
+    # Registry lookups for the benchmark zone go to the farm's RDAP endpoint
+    whois_client.rdap_routes = {BENCH_ZONE: services["rdap_base"]}
+
+    username_sites = load_username_sites(services["username_sites"])
+    email_sites = load_email_sites(services["email_sites"])
+    session = get_session()
+
+    async def lookup(index):
+        if module == "username":
+            return await search_usernames(f"benchuser{index}", session=session, sites=username_sites)
+        if module == "email_recon":
+            return await search_email_registrations(f"bench{index}@example.com", session=session, sites=email_sites)
+        return await analyze_domain_async(f"site{index}.{BENCH_ZONE}", verbose=False)
+
+    latencies = []
+    failures = 0
+    queue = asyncio.Queue()
+    for index in range(count):
+        queue.put_nowait(index)
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            index = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await lookup(index)
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await close_session()
+    return latencies, failures, time.perf_counter() - started
+
+def _client_process(module, count, concurrency, services, host_rate):
+    # Runs in its own process so peak memory belongs to this module alone
+    latencies, failures, elapsed = asyncio.run(_run_client(module, count, concurrency, services, host_rate))
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "module": module,
+        "targets": count,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "targets_per_sec": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50": round(_percentile(latencies, 50), 4),
+        "p99": round(_percentile(latencies, 99), 4),
+        "peak_rss_mb": round(peak_kb / 1024 if sys.platform != "darwin" else peak_kb / 1048576, 1),
+    }
+
+def run_benchmarks(modules=BENCH_MODULES, count=100, concurrency=20, profile=None, host_rate=None):
+    """Benchmarks each module against the local mock services and returns one result dict per module."""
+    services = MockServices(profile or FarmProfile()).start()
+    info = {
+        "dns_port": services.dns_port,
+        "rdap_base": f"http://{services.farm._host(0)}:{services.http_port}/rdap/",
+        "username_sites": services.username_sites_path,
+        "email_sites": services.email_sites_path,
+    }
+    results = []
+    try:
+        for module in modules:
+            before = dict(services.farm.counts, dns_queries=services.dns.queries)
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(_client_process, module, count, concurrency, info, host_rate).result()
+            after = dict(services.farm.counts, dns_queries=services.dns.queries)
+            result.update({key: after[key] - before[key] for key in after})
+            results.append(result)
+    finally:
+        services.stop()
+    return results
+
+def print_results(results):
+    for r in results:
+        print(f"[*] {r['module']}: {r['targets']} targets in {r['seconds']}s, {r['targets_per_sec']} targets/s, "
+              f"p50 {r['p50']}s, p99 {r['p99']}s, peak RSS {r['peak_rss_mb']} MB "
+              f"({r['requests']} HTTP requests, {r['throttled']} throttled, {r['hung']} hung, "
+              f"{r['dns_queries']} DNS queries, {r['failures']} failures)")
@@ -0,0 +1,151 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from modules.http_client import USER_AGENT
+from modules.settings import get_settings
+
+# Browsers are restarted after this many pages to keep memory growth in check
+MAX_PAGES_PER_BROWSER = 50
+ACQUIRE_TIMEOUT = 300
+# After the pool fails to start, lookups fail fast with the same error for this many seconds
+START_RETRY_DELAY = 300
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+_start_failure = None # (monotonic time, exception) of the last failed pool start
+
+def get_driver_path():
+    """Resolves the chromedriver binary once per process instead of once per lookup."""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+def new_driver(proxy=None):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    if proxy:
+        options.add_argument(f'--proxy-server={proxy}')
+    return webdriver.Chrome(service=ChromeService(get_driver_path()), options=options)
+
+class BrowserWorker:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+class BrowserPool:
+    """
+    Keeps `size` headless Chrome instances running and lends them out one lookup at a time.
+    Callers block until a browser is free, so the pool doubles as the lookup queue. Browsers
+    are health-checked before use and replaced when they crash or reach `max_pages`.
+    """
+
+    def __init__(self, size=None, proxy=None, max_pages=MAX_PAGES_PER_BROWSER):
+        size = size or get_settings().browser_pool_size
+        self.proxy = proxy
+        self.max_pages = max_pages
+        self._idle = queue.Queue()
+        self._closed = False
+        # Start all browsers at once; startup dominates a cold lookup
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            futures = [executor.submit(new_driver, proxy) for _ in range(size)]
+        failed = next((future.exception() for future in futures if future.exception()), None)
+        if failed is not None:
+            # Quit the browsers that did start, or their Chrome processes outlive us
+            for future in futures:
+                if not future.exception():
+                    try:
+                        future.result().quit()
+                    except Exception:
+                        pass
+            raise failed
+        for future in futures:
+            self._idle.put(BrowserWorker(future.result()))
+        self.size = size
+
+    def _healthy(self, worker):
+        try:
+            worker.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _restart(self, worker):
+        try:
+            worker.driver.quit()
+        except Exception:
+            pass
+        return BrowserWorker(new_driver(self.proxy))
+
+    def _recycle(self, worker):
+        # Leave no state from the previous lookup behind for the next one
+        try:
+            worker.driver.delete_all_cookies()
+            worker.driver.get("about:blank")
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self, timeout=ACQUIRE_TIMEOUT):
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        worker = self._idle.get(timeout=timeout)
+        try:
+            if worker.pages >= self.max_pages or not self._healthy(worker):
+                worker = self._restart(worker)
+            worker.pages += 1
+            yield worker.driver
+        finally:
+            # A crashed browser is caught by the health check on its next use
+            self._recycle(worker)
+            self._idle.put(worker)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.driver.quit()
+            except Exception:
+                pass
+
+def get_pool(proxy=None, size=None):
+    """Returns the process-wide browser pool, starting it on first use with `size` ([LIMITS] BROWSERS) browsers."""
+    global _pool, _start_failure
+    with _pool_lock:
+        if _pool is None:
+            # A broken Chrome install would otherwise be retried, and time out, on every lookup
+            if _start_failure and time.monotonic() - _start_failure[0] < START_RETRY_DELAY:
+                raise _start_failure[1]
+            try:
+                _pool = BrowserPool(size, proxy)
+            except Exception as e:
+                _start_failure = (time.monotonic(), e)
+                raise
+            _start_failure = None
+            atexit.register(close_pool)
+    return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,287 @@
+import asyncio
+import base64
+import binascii
+import random
+import re
+import string
+import time
+from datetime import date
+
+import dns.exception
+import dns.resolver
+
+from modules.dns_cache import dns_cache
+from modules.metrics import metrics
+from modules.ratelimit import TokenBucket
+from modules.settings import get_settings
+
+DEFAULT_CONCURRENCY = 50
+DNS_LOOKUP_ERRORS = (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers)
+
+# Provider -> (its selectors, most used first; MX hosts or SPF includes that give it away)
+PROVIDERS = {
+    "Google Workspace": (("google", "google2048", "googleapps", "ga1"), ("google.com", "googlemail.com")),
+    "Microsoft 365": (("selector1", "selector2"), ("outlook.com",)),
+    "Amazon SES": (("amazonses",), ("amazonses.com",)),
+    "Mailchimp": (("k1", "k2", "k3", "mandrill", "mte1", "mte2"), ("mandrillapp.com", "mcsv.net", "mcdlv.net")),
+    "SendGrid": (("s1", "s2", "smtpapi", "sendgrid"), ("sendgrid.net",)),
+    "Mailgun": (("mailo", "mg", "krs", "pic"), ("mailgun.org",)),
+    "Postmark": (("pm", "pm-bounces"), ("mtasv.net", "postmarkapp.com")),
+    "SparkPost": (("scph0920", "scph1220", "sparkpost"), ("sparkpostmail.com",)),
+    "Proton Mail": (("protonmail", "protonmail2", "protonmail3"), ("protonmail.ch", "proton.me")),
+    "Fastmail": (("fm1", "fm2", "fm3", "mesmtp"), ("messagingengine.com",)),
+    "Zoho Mail": (("zoho", "zmail", "zm1", "zm2", "zmail1"), ("zoho.com", "zoho.eu", "zohomail.com")),
+    "iCloud Mail": (("sig1",), ("icloud.com", "me.com")),
+    "Yahoo": (("s1024", "s2048", "yahoo"), ("yahoodns.net", "yahoo.com")),
+    "Yandex": (("yandex",), ("yandex.net", "yandex.ru")),
+    "Mailjet": (("mailjet",), ("mailjet.com",)),
+    "Brevo": (("brevo1", "brevo2", "sib"), ("sendinblue.com", "brevo.com")),
+    "HubSpot": (("hs1", "hs2", "hubspot"), ("hubspotemail.net", "hubspot.com")),
+    "Salesforce": (("sf1", "sf2", "salesforce"), ("salesforce.com", "exacttarget.com")),
+    "Constant Contact": (("ctct1", "ctct2"), ("constantcontact.com", "ctctcdn.com")),
+    "Campaign Monitor": (("cm",), ("cmail1.com", "cmail2.com", "createsend.com")),
+    "Zendesk": (("zendesk1", "zendesk2"), ("zendesk.com",)),
+    "Freshdesk": (("fddkim", "freshdesk"), ("freshemail.io", "freshdesk.com")),
+    "Mimecast": (("mimecast", "mimecast20190104"), ("mimecast.com",)),
+    "Proofpoint": (("proofpoint",), ("pphosted.com", "ppe-hosted.com")),
+    "Klaviyo": (("kl", "kl2"), ("klaviyomail.com", "klaviyo.com")),
+    "Intercom": (("intercom", "ic"), ("intercom-mail.com", "intercom.io")),
+    "Everlytic": (("everlytickey1", "everlytickey2", "eversrv"), ("everlytic.net",)),
+    "Mailerlite": (("ml", "ml2", "litesrv"), ("mlsend.com", "mailerlite.com")),
+    "GoDaddy": (("secureserver",), ("secureserver.net",)),
+}
+
+# The most widely deployed selectors, all a quick scan tries besides the hinted provider's
+COMMON_SELECTORS = (
+    "default", "google", "selector1", "selector2", "k1", "k2", "s1", "s2", "dkim", "mail", "smtp",
+    "key1", "mandrill", "amazonses", "protonmail", "fm1", "zoho", "sig1", "pm", "hs1", "ctct1",
+    "cm", "zendesk1", "everlytickey1", "mailjet",
+)
+
+# Selectors no provider owns: panel defaults, DKIM tooling defaults and plain counters
+GENERIC_SELECTORS = (
+    "default", "dkim", "mail", "email", "smtp", "key", "selector", "x", "s", "k", "main", "mx",
+    "domainkey", "dk", "mailkey", "mta", "mta1", "mta2", "out", "outbound", "newsletter",
+    "marketing", "news", "primary", "alt", "ecm1", "mailsec", "dkimkey", "s768", "s1024",
+    "s2048", "s4096", "rsa", "rsa1024", "rsa2048", "ed25519", "cpanel", "plesk", "exim",
+    "postfix", "mdaemon", "zimbra", "kerio", "hmailserver", "mailenable", "smartermail",
+)
+COUNTED_PREFIXES = ("s", "k", "key", "dkim", "selector", "sel", "mail", "mx", "m", "d")
+COUNT = 10
+# Date-based selectors, as rotated by hand or by providers, for this many past years
+DATED_YEARS = 10
+DATED_FORMATS = ("{y}{m}", "s{y}{m}", "k{y}{m}", "dkim{y}{m}", "key{y}{m}", "selector{y}{m}", "sel{y}{m}", "mail{y}{m}",
+                 "m{y}{m}", "{y}{m}01", "{y}-{m}", "{yy}{m}", "scph{m}{yy}")
+YEARLY_FORMATS = ("{y}", "s{y}", "k{y}", "dkim{y}", "key{y}", "selector{y}", "sel{y}", "mail{y}", "google{y}", "default{y}")
+
+_SELECTOR_PROVIDERS = {}
+for _provider, (_selectors, _) in PROVIDERS.items():
+    for _selector in _selectors:
+        _SELECTOR_PROVIDERS.setdefault(_selector, _provider)
+
+def dated_selectors(today=None):
+    """Year and month based selectors for the last DATED_YEARS years, newest first."""
+    today = today or date.today()
+    selectors = []
+    for year in range(today.year + 1, today.year - DATED_YEARS, -1):
+        values = {"y": year, "yy": f"{year % 100:02d}"}
+        selectors += (pattern.format(**values) for pattern in YEARLY_FORMATS)
+        for month in range(12, 0, -1):
+            selectors += (pattern.format(m=f"{month:02d}", **values) for pattern in DATED_FORMATS)
+    return selectors
+
+def selector_dictionary(hinted=(), thorough=True):
+    """
+    Selectors to try, most likely first: those of the `hinted` providers and the common ones,
+    then with `thorough` every other provider's, the generic ones and their counted forms
+    (s1..s10, key1..key10, ...) and the date-based patterns, which make up most of the dictionary.
+    """
+    selectors = [selector for provider in hinted for selector in PROVIDERS[provider][0]]
+    selectors += COMMON_SELECTORS
+    if thorough:
+        selectors += (selector for provider_selectors, _ in PROVIDERS.values() for selector in provider_selectors)
+        selectors += GENERIC_SELECTORS
+        selectors += (f"{prefix}{n}" for n in range(1, COUNT + 1) for prefix in COUNTED_PREFIXES)
+        selectors += dated_selectors()
+    return list(dict.fromkeys(selectors))
+
+def iter_selectors(path):
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            selector = line.strip().lower()
+            if selector and not selector.startswith("#"):
+                yield selector
+
+def _spf_includes(spf_records):
+    for record in spf_records:
+        for term in _txt_value(record).lower().split():
+            term = term.lstrip("+?~-")
+            for prefix in ("include:", "redirect="):
+                if term.startswith(prefix):
+                    yield term[len(prefix):]
+
+def guess_providers(mx_records, spf_records):
+    """Providers whose mail hosts appear in the MX records or whose SPF include the domain uses."""
+    hosts = [record.split()[-1].rstrip(".").lower() for record in mx_records]
+    hosts += _spf_includes(spf_records)
+    return [provider for provider, (_, markers) in PROVIDERS.items()
+            if any(host == marker or host.endswith("." + marker) for host in hosts for marker in markers)]
+
+def _txt_value(record):
+    # TXT answers come as one or more quoted strings, split at 255 bytes; the value is their concatenation
+    parts = re.findall(r'"((?:[^"\\]|\\.)*)"', record)
+    return "".join(parts) if parts else record
+
+def _der_item(data, offset):
+    tag, length = data[offset], data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7F
+        length = int.from_bytes(data[offset:offset + count], "big")
+        offset += count
+    if offset + length > len(data):
+        raise ValueError("truncated DER")
+    return tag, data[offset:offset + length], offset + length
+
+def rsa_key_bits(der):
+    """Modulus size of an RSA public key, given as SubjectPublicKeyInfo or bare RSAPublicKey DER."""
+    _, body, _ = _der_item(der, 0)
+    tag, first, end = _der_item(body, 0)
+    if tag == 0x30:
+        # SubjectPublicKeyInfo: the algorithm, then a BIT STRING wrapping the RSAPublicKey
+        _, bit_string, _ = _der_item(body, end)
+        _, body, _ = _der_item(bit_string[1:], 0)
+        _, first, _ = _der_item(body, 0)
+    return int.from_bytes(first, "big").bit_length()
+
+def parse_dkim_record(record):
+    """
+    Parses a DKIM key record (RFC 6376 3.6.1) into its metadata: key type, key size in bits,
+    accepted hashes, flags, whether the key is revoked (empty p=) or in testing mode (t=y).
+    Returns None when the TXT record is not a DKIM key.
+    """
+    tags = {}
+    for part in _txt_value(record).split(";"):
+        name, sep, value = part.partition("=")
+        if sep:
+            tags[name.strip().lower()] = value.strip()
+    if "p" not in tags or tags.get("v", "DKIM1") != "DKIM1":
+        return None
+    public_key = re.sub(r"\s+", "", tags["p"])
+    flags = [flag.strip() for flag in tags.get("t", "").split(":") if flag.strip()]
+    key = {
+        "key_type": tags.get("k", "rsa").lower(),
+        "bits": None,
+        "hashes": [h.strip() for h in tags["h"].split(":")] if tags.get("h") else [],
+        "flags": flags,
+        "testing": "y" in flags,
+        "revoked": not public_key,
+        "error": None,
+    }
+    if public_key:
+        try:
+            der = base64.b64decode(public_key, validate=True)
+            if key["key_type"] == "ed25519":
+                key["bits"] = len(der) * 8
+            elif key["key_type"] == "rsa":
+                key["bits"] = rsa_key_bits(der)
+        except (binascii.Error, ValueError, IndexError) as e:
+            key["error"] = f"Unreadable public key: {e or 'truncated'}"
+    return key
+
+async def _lookup(name, rtype, limiter, label):
+    await limiter.acquire()
+    with metrics.timed("dkim", "dns_lookup", label):
+        return await dns_cache.resolve(name, rtype, lifetime=get_settings().dns_timeout)
+
+async def _optional(lookup):
+    try:
+        return await lookup
+    except (dns.exception.DNSException, OSError):
+        return []
+
+async def discover_dkim(domain, selectors=None, thorough=True, exhaustive=False, qps=None,
+                        concurrency=DEFAULT_CONCURRENCY, budget=None, on_found=None):
+    """
+    Looks for the domain's DKIM keys by querying <selector>._domainkey.<domain> for every selector
+    of the dictionary (or of `selectors`, an iterable or wordlist path) concurrently, at most
+    `qps` queries per second. The MX and SPF records hint at the mail provider, whose selectors
+    go first; the scan stops once a key under a provider's own selector names the provider,
+    unless `exhaustive`. No new selector is queried once `budget` seconds have passed.
+    `on_found(key)` is called for every key as it is found.
+    """
+    limiter = TokenBucket(qps or get_settings().dkim_qps)
+    mx, txt = await asyncio.gather(_optional(_lookup(domain, "MX", limiter, "MX")),
+                                   _optional(_lookup(domain, "TXT", limiter, "TXT")))
+    hinted = guess_providers(mx, [record for record in txt if "v=spf1" in record])
+    if selectors is None:
+        selectors = selector_dictionary(hinted, thorough)
+    elif isinstance(selectors, str):
+        selectors = iter_selectors(selectors)
+
+    report = {"domain": domain, "provider": None, "hinted": hinted, "keys": [], "checked": 0,
+              "errors": 0, "wildcard": False, "stopped_early": False, "timed_out": False, "elapsed": 0.0}
+    started = time.monotonic()
+    stop = asyncio.Event()
+
+    def add(selector, records):
+        for record in records:
+            key = parse_dkim_record(record)
+            if key is None:
+                continue
+            provider = _SELECTOR_PROVIDERS.get(selector)
+            key = {"selector": selector, "provider": provider, **key, "record": _txt_value(record)}
+            report["keys"].append(key)
+            if on_found:
+                on_found(key)
+            # A generic selector says nothing about who signs; a provider's own selector does
+            if provider and not report["provider"]:
+                report["provider"] = provider
+                if not exhaustive:
+                    stop.set()
+
+    # A zone that answers every selector would make each one look like a key
+    label = "".join(random.choices(string.ascii_lowercase + string.digits, k=16))
+    wildcard = await _optional(_lookup(f"{label}._domainkey.{domain}", "TXT", limiter, "DKIM"))
+    if any(parse_dkim_record(record) for record in wildcard):
+        report["wildcard"] = True
+        add("*", wildcard)
+        report["elapsed"] = time.monotonic() - started
+        return report
+
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+
+    async def worker():
+        while True:
+            selector = await queue.get()
+            if selector is None:
+                return
+            if stop.is_set():
+                report["stopped_early"] = True
+                continue
+            try:
+                add(selector, await _lookup(f"{selector}._domainkey.{domain}", "TXT", limiter, "DKIM"))
+            except DNS_LOOKUP_ERRORS:
+                pass # No key under this selector
+            except (dns.exception.DNSException, OSError):
+                report["errors"] += 1
+            report["checked"] += 1
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for selector in selectors:
+            if stop.is_set():
+                report["stopped_early"] = True
+                break
+            if budget is not None and time.monotonic() - started > budget:
+                report["timed_out"] = True
+                break
+            await queue.put(selector)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+    report["elapsed"] = time.monotonic() - started
+    return report
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import OrderedDict
+import dns.asyncresolver
+import dns.rdatatype
+import dns.resolver
+
+from modules.settings import get_settings
+
+NEGATIVE_TTL = 300 # Used when a negative answer carries no SOA to take the TTL from
+MAX_TTL = 86400
+DNS_TIMEOUT = 15
+
+NEGATIVE_ERRORS = (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN)
+
+class _Abandoned(Exception):
+    """Set on a shared query whose owner was cancelled, so its waiters send their own instead."""
+
+def _negative_ttl(error):
+    # RFC 2308: negative answers are cached for min(SOA TTL, SOA MINIMUM) from the authority section
+    if isinstance(error, dns.resolver.NXDOMAIN):
+        responses = error.responses().values()
+    else:
+        response = error.kwargs.get("response")
+        responses = [response] if response is not None else []
+    for response in responses:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return min(rrset.ttl, rrset[0].minimum)
+    return NEGATIVE_TTL
+
+class DNSCache:
+    """LRU cache of DNS answers that honors record TTLs and also caches NXDOMAIN/NoAnswer."""
+
+    def __init__(self, max_entries=None):
+        self._max_entries = max_entries
+        self._entries = OrderedDict() # (name, rtype) -> (expires, records or exception)
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_entries(self):
+        # Without an explicit size the cache follows [CACHE] DNS_ENTRIES, also when it changes mid-run
+        return self._max_entries or get_settings().dns_cache_entries
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key, ttl, value):
+        self._entries[key] = (time.monotonic() + min(ttl, MAX_TTL), value)
+        self._entries.move_to_end(key)
+        max_entries = self.max_entries
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def resolve(self, name, rtype, resolver=None, lifetime=DNS_TIMEOUT):
+        """Returns the answer as a list of strings; raises NXDOMAIN/NoAnswer (cached) like dnspython does."""
+        key = (name.lower().rstrip("."), rtype.upper())
+        entry = self._get(key)
+        if entry is not None:
+            self.hits += 1
+            if isinstance(entry[1], Exception):
+                raise entry[1]
+            return list(entry[1])
+
+        # Identical queries already on the wire share one answer
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is loop:
+            self.hits += 1
+            try:
+                return list(await asyncio.shield(pending))
+            except _Abandoned:
+                return await self.resolve(name, rtype, resolver, lifetime)
+
+        self.misses += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            resolver = resolver or dns.asyncresolver.get_default_resolver()
+            answers = await resolver.resolve(name, rtype, lifetime=lifetime)
+            records = tuple(str(rdata) for rdata in answers)
+            self._put(key, answers.rrset.ttl, records)
+            future.set_result(records)
+            return list(records)
+        except NEGATIVE_ERRORS as e:
+            self._put(key, _negative_ttl(e), e)
+            future.set_exception(e)
+            raise
+        except asyncio.CancelledError:
+            # Only the owner was cancelled (e.g. its stage timed out); the waiters still want an answer
+            future.set_exception(_Abandoned())
+            raise
+        except Exception as e:
+            # Timeouts and server failures are not cached
+            future.set_exception(e)
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            # Nobody else awaited it; keep asyncio from warning about an unretrieved exception
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+# Process-wide cache shared by every DNS lookup in the domain modules
+dns_cache = DNSCache()
+
+async def resolve(name, rtype, resolver=None, lifetime=DNS_TIMEOUT):
+    return await dns_cache.resolve(name, rtype, resolver, lifetime)
@@ -1,92 +1,113 @@
-import whois
+import asyncio
 import dns.resolver
-import socket
-import ssl
 import ipaddress
-import configparser
-import os
 
-def get_whois_info(domain):
+from modules.dkim import discover_dkim
+from modules.dns_cache import dns_cache
+from modules.http_client import close_session
+from modules.journal import journaled
+from modules.metrics import metrics
+from modules.settings import get_settings
+from modules.subdomain import enumerate_subdomains
+from modules.whois_client import whois_client, WhoisError
+from modules.tls_scan import scan_host, scan_hosts, supported_versions, is_complete
+
+DNS_LOOKUP_ERRORS = (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers)
+
+async def _resolve(name, rtype, semaphore, label=None):
+    async with semaphore:
+        with metrics.timed("domain", "dns_lookup", label or rtype):
+            return await dns_cache.resolve(name, rtype, lifetime=get_settings().dns_timeout)
+
+async def get_whois_info_async(domain):
+    """Returns the parsed registration record (RDAP, or WHOIS as a fallback), or {"error": ...}."""
+    timeout = get_settings().whois_timeout
     try:
-        # whois library might use system-wide proxy settings if set via environment variables
-        w = whois.whois(domain)
-        return w.text
-    except Exception as e:
-        return f"Error getting WHOIS info: {e}"
-
-def get_dns_info(domain):
+        with metrics.timed("domain", "whois"):
+            return await asyncio.wait_for(whois_client.lookup(domain), timeout)
+    except asyncio.TimeoutError:
+        return {"error": f"Error getting WHOIS info: timed out after {timeout:g}s"}
+    except (WhoisError, OSError) as e:
+        return {"error": f"Error getting WHOIS info: {e}"}
+    except ValueError as e:
+        # Not a valid domain name, e.g. a label IDNA cannot encode
+        return {"error": f"Error getting WHOIS info: invalid domain name ({e})"}
+
+def spf_records(txt_records):
+    return [r for r in txt_records if "v=spf1" in r]
+
+async def get_dmarc_async(domain, semaphore):
+    """The domain's DMARC policy records; raises DNS_LOOKUP_ERRORS like the resolver when there are none."""
+    records = await _resolve(f"_dmarc.{domain}", 'TXT', semaphore, 'DMARC')
+    return [r for r in records if "v=DMARC1" in r]
+
+async def get_dns_info_async(domain, semaphore=None, dkim=True):
+    semaphore = semaphore or asyncio.Semaphore(get_settings().domain_workers)
     results = {}
     record_types = ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'PTR']
-    for rtype in record_types:
+
+    async def lookup(rtype):
         try:
             # dnspython does not directly support proxies for DNS queries
-            answers = dns.resolver.resolve(domain, rtype)
-            results[rtype] = [str(rdata) for rdata in answers]
-        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers):
+            results[rtype] = await _resolve(domain, rtype, semaphore)
+        except DNS_LOOKUP_ERRORS:
             results[rtype] = []
         except Exception as e:
             results[rtype] = [f"Error: {e}"]
 
-    # Check for SPF, DMARC, DKIM
-    try:
-        spf_records = dns.resolver.resolve(domain, 'TXT')
-        results['SPF'] = [str(rdata) for rdata in spf_records if "v=spf1" in str(rdata)]
-    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers):
-        results['SPF'] = []
+    async def lookup_dmarc():
+        try:
+            results['DMARC'] = await get_dmarc_async(domain, semaphore)
+        except DNS_LOOKUP_ERRORS:
+            results['DMARC'] = []
+        except Exception as e:
+            results['DMARC'] = [f"Error: {e}"]
 
-    try:
-        dmarc_records = dns.resolver.resolve(f"_dmarc.{domain}", 'TXT')
-        results['DMARC'] = [str(rdata) for rdata in dmarc_records if "v=DMARC1" in str(rdata)]
-    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers):
-        results['DMARC'] = []
+    # The provider and generic selectors only; the dated ones are left to a thorough `dkim` scan
+    dkim_task = asyncio.ensure_future(discover_dkim(domain, thorough=False)) if dkim else None
+    await asyncio.gather(*(lookup(rtype) for rtype in record_types), lookup_dmarc())
 
-    try:
-        # Common DKIM selectors, can be expanded
-        dkim_selectors = ['default', 'google', 'selector1', 'selector2']
-        results['DKIM'] = []
-        for selector in dkim_selectors:
-            try:
-                dkim_records = dns.resolver.resolve(f"{selector}._domainkey.{domain}", 'TXT')
-                results['DKIM'].extend([str(rdata) for rdata in dkim_records if "v=DKIM1" in str(rdata)])
-            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers):
-                pass
-    except Exception as e:
-        results['DKIM'] = [f"Error: {e}"]
+    # SPF lives in the TXT answer we already have
+    results['SPF'] = spf_records(results['TXT'])
+
+    if dkim_task:
+        try:
+            results['DKIM'] = [key["record"] for key in (await dkim_task)["keys"]]
+        except Exception as e:
+            results['DKIM'] = [f"Error: {e}"]
 
     return results
 
-def get_subdomains(domain, common_subdomains=None):
+async def get_subdomains_async(domain, common_subdomains=None, concurrency=None):
     if common_subdomains is None:
         common_subdomains = ['www', 'mail', 'ftp', 'blog', 'dev', 'test', 'api', 'admin', 'webmail', 'cpanel']
+    found = await enumerate_subdomains(domain, common_subdomains, concurrency=concurrency or get_settings().domain_workers)
+    return [subdomain for subdomain, _ in found]
+
+async def check_ssl_tls_versions_async(domain, port=443, semaphore=None):
+    """Returns the TLS versions the server accepts, each negotiated with its own pinned handshake."""
+    return supported_versions(await scan_host(domain, port, semaphore))
 
-    found_subdomains = []
-    for sub in common_subdomains:
-        subdomain = f"{sub}.{domain}"
+def _run(coro):
+    """Runs `coro` on a fresh event loop, closing the pooled HTTP session it opened before the loop goes."""
+    async def run():
         try:
-            # socket.gethostbyname does not directly support proxies
-            socket.gethostbyname(subdomain)
-            found_subdomains.append(subdomain)
-        except socket.gaierror:
-            pass # Subdomain does not exist
-        except Exception as e:
-            found_subdomains.append(f"{subdomain} (Error: {e})")
-    return found_subdomains
+            return await coro
+        finally:
+            await close_session()
+    return asyncio.run(run())
+
+def get_whois_info(domain):
+    return _run(get_whois_info_async(domain))
+
+def get_dns_info(domain):
+    return _run(get_dns_info_async(domain))
+
+def get_subdomains(domain, common_subdomains=None):
+    return _run(get_subdomains_async(domain, common_subdomains))
 
 def check_ssl_tls_versions(domain, port=443):
-    supported_versions = []
-    context = ssl.create_default_context()
-    # Try to connect with different minimum TLS versions
-    for min_version in [ssl.TLSVersion.TLSv1_2, ssl.TLSVersion.TLSv1_3]:
-        try:
-            # Direct socket connections do not use HTTP/HTTPS proxies automatically
-            with socket.create_connection((domain, port), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                    supported_versions.append(ssock.version())
-        except (ssl.SSLError, socket.timeout, ConnectionRefusedError):
-            pass
-        except Exception as e:
-            supported_versions.append(f"Error checking {min_version.name}: {e}")
-    return list(set(supported_versions)) # Return unique versions
+    return _run(check_ssl_tls_versions_async(domain, port))
 
 def is_private_ip(ip_address):
     try:
@@ -95,31 +116,79 @@ def is_private_ip(ip_address):
     except ValueError:
         return False # Not a valid IP address
 
-def analyze_domain(domain):
+async def _run_stage(coro, timeout, fallback):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        return fallback
+
+async def analyze_domain_async(domain, verbose=True, max_workers=None, wordlist=None, journal=None):
     results = {
         "whois": None,
         "dns": None,
         "subdomains": None,
         "ssl_tls_versions": None,
-        "private_ip_warning": False
+        "tls": None,
+        "dkim": None,
+        "private_ip_warning": False,
+        # Stages that failed, timed out or were cut off; such results are kept out of the result cache
+        "incomplete": [],
     }
 
-    config = configparser.ConfigParser()
-    config.read('config.ini')
+    # One snapshot for the whole analysis, so a config reload cannot mix old and new budgets
+    settings = get_settings()
+    max_workers = max_workers or settings.domain_workers
 
-    # Set environment variables for proxy, some libraries might pick them up
-    if config.has_section('PROXY'):
-        http_proxy = config['PROXY'].get('HTTP_PROXY')
-        https_proxy = config['PROXY'].get('HTTPS_PROXY')
-        if http_proxy: os.environ['HTTP_PROXY'] = http_proxy
-        if https_proxy: os.environ['HTTPS_PROXY'] = https_proxy
+    if verbose:
+        print(f"[*] Getting WHOIS info, DNS info, common subdomains and SSL/TLS versions for {domain}...")
 
-    print(f"[*] Getting WHOIS info for {domain}...")
-    results["whois"] = get_whois_info(domain)
+    # All stages are independent, so they share one worker budget and run at the same time
+    semaphore = asyncio.Semaphore(max_workers)
+    dns_timeout = {"Error": [f"DNS lookups timed out after {settings.dns_timeout:g}s"]}
+    subdomains_timeout = []
 
-    print(f"[*] Getting DNS info for {domain}...")
-    dns_info = get_dns_info(domain)
+    finished = {
+        "whois": lambda info: "error" not in info,
+        "dns": lambda info: "Error" not in info,
+        "dkim": lambda report: not report["timed_out"] and not report["errors"],
+        "subdomains": lambda found: found is not subdomains_timeout,
+        "tls": lambda reports: all(is_complete(report) for report in reports),
+    }
+
+    def stage(name, run):
+        # Each stage is a journal unit; stages that failed or timed out are retried on resume
+        return journaled(journal, "domain", domain, name, run, finished[name])
+
+    # A user-supplied wordlist can legitimately take longer than the default stage budget
+    subdomains_task = asyncio.ensure_future(stage(
+        "subdomains", lambda: _run_stage(get_subdomains_async(domain, wordlist, max_workers),
+                                         None if wordlist else settings.subdomain_timeout, subdomains_timeout)))
+
+    async def scan_tls():
+        # The apex is scanned together with every subdomain that resolved
+        hosts = [domain, *await subdomains_task]
+        return await scan_hosts(hosts, concurrency=max_workers, budget=settings.tls_budget,
+                                handshake_timeout=settings.tls_handshake_timeout)
+
+    whois_info, dns_info, dkim_report, subdomains, tls_reports = await asyncio.gather(
+        stage("whois", lambda: get_whois_info_async(domain)),
+        stage("dns", lambda: _run_stage(get_dns_info_async(domain, semaphore, dkim=False), settings.dns_timeout, dns_timeout)),
+        stage("dkim", lambda: discover_dkim(domain, thorough=False, budget=settings.dkim_timeout)),
+        subdomains_task,
+        stage("tls", scan_tls),
+    )
+    if "Error" not in dns_info:
+        dns_info["DKIM"] = [key["record"] for key in dkim_report["keys"]]
+    results["whois"] = whois_info
     results["dns"] = dns_info
+    results["dkim"] = dkim_report
+    results["subdomains"] = subdomains
+    results["tls"] = tls_reports
+    stages = {"whois": whois_info, "dns": dns_info, "dkim": dkim_report, "subdomains": subdomains, "tls": tls_reports}
+    results["incomplete"] = [name for name, value in stages.items() if not finished[name](value)]
+    # Picked by host too, since reports journaled by older runs may be in completion order
+    apex_report = next((report for report in tls_reports if report["host"] == domain), tls_reports[0])
+    results["ssl_tls_versions"] = supported_versions(apex_report)
 
     # Check for private IPs in A and AAAA records
     for ip_list in [dns_info.get('A', []), dns_info.get('AAAA', [])]:
@@ -130,10 +199,7 @@ def analyze_domain(domain):
         if results["private_ip_warning"]:
             break
 
-    print(f"[*] Searching for common subdomains for {domain}...")
-    results["subdomains"] = get_subdomains(domain)
-
-    print(f"[*] Checking SSL/TLS versions for {domain}...")
-    results["ssl_tls_versions"] = check_ssl_tls_versions(domain)
+    return results
 
-    return results
\ No newline at end of file
+def analyze_domain(domain, verbose=True):
+    return _run(analyze_domain_async(domain, verbose))
@@ -1,73 +1,186 @@
-import configparser
+import asyncio
+import aiohttp
+import hashlib
+import weakref
 import requests
 
+from modules.browser_pool import get_pool
+from modules.http_client import get_requests_session, get_session
+from modules.ratelimit import HostScheduler, RateLimitedError, get_scheduler
+from modules.result_cache import normalize_email
+from modules.settings import get_settings
+
 HIBP_API_URL = "https://haveibeenpwned.com/api/v3/breachedaccount/{account}"
 HIBP_UNIFIED_URL = "https://haveibeenpwned.com/unifiedsearch/{account}"
+PWNED_RANGE_URL = "https://api.pwnedpasswords.com/range/{prefix}"
+
+# Full breach records (Domain, BreachDate, DataClasses) instead of just names
+HIBP_PARAMS = {"truncateResponse": "false"}
+HIBP_RETRIES = 5
+BULK_CONCURRENCY = 20
+
+# One paced scheduler per event loop so every lookup shares the key's budget
+_hibp_schedulers = weakref.WeakKeyDictionary()
+# Lookups waiting for a browser wait here, not in a default-executor thread
+_browser_slots = weakref.WeakKeyDictionary()
 
-def check_email_breach(email):
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-    api_key = config['API_KEYS'].get('HIBP_API_KEY')
+def _hibp_scheduler(rate_per_minute):
+    loop = asyncio.get_running_loop()
+    scheduler = _hibp_schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _hibp_schedulers[loop] = HostScheduler(
+            host_rate=rate_per_minute / 60, retries=HIBP_RETRIES, min_rate=rate_per_minute / 60)
+    elif scheduler.host_rate != rate_per_minute / 60:
+        # The subscription rate was changed in config.ini during the run
+        scheduler.set_host_rate(rate_per_minute / 60, min_rate=rate_per_minute / 60)
+    return scheduler
 
-    proxies = {}
-    if config.has_section('PROXY'):
-        http_proxy = config['PROXY'].get('HTTP_PROXY')
-        https_proxy = config['PROXY'].get('HTTPS_PROXY')
-        if http_proxy: proxies['http'] = http_proxy
-        if https_proxy: proxies['https'] = https_proxy
+def _browser_slot():
+    loop = asyncio.get_running_loop()
+    slots = _browser_slots.get(loop)
+    if slots is None:
+        # Sized like the pool, which keeps the size it started with for the rest of the run
+        slots = _browser_slots[loop] = asyncio.Semaphore(get_settings().browser_pool_size)
+    return slots
+
+def check_email_breach(email, verbose=True):
+    settings = get_settings()
+    api_key = settings.hibp_api_key
+    https_proxy = settings.https_proxy
 
     if api_key:
-        print("INFO: Using HIBP API key.")
+        if verbose:
+            print("INFO: Using HIBP API key.")
         headers = {"hibp-api-key": api_key}
         try:
-            response = requests.get(HIBP_API_URL.format(account=email), headers=headers, proxies=proxies)
+            # Pooled session: keep-alive connections and the configured proxies are shared across lookups
+            response = get_requests_session().get(HIBP_API_URL.format(account=email), headers=headers, params=HIBP_PARAMS)
             if response.status_code == 200:
-                return response.json()
+                return {"breaches": response.json()}
             elif response.status_code == 404:
-                return [] # No breaches found
+                return {"breaches": []} # No breaches found
             else:
                 return {"error": f"API returned status code {response.status_code}"}
         except requests.exceptions.RequestException as e:
             return {"error": f"An error occurred during API request: {e}"}
     else:
-        print("WARNING: No HIBP API key found. Trying experimental method with Selenium.")
-        print("INFO: This requires Selenium and a compatible browser (like Chrome) to be installed.")
-        print("INFO: The first run might be slow as it downloads the necessary browser driver.")
+        if verbose:
+            print("WARNING: No HIBP API key found. Trying experimental method with Selenium.")
+            print("INFO: This requires Selenium and a compatible browser (like Chrome) to be installed.")
+            print("INFO: The first run might be slow as it downloads the necessary browser driver and starts the browsers.")
 
         try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.service import Service as ChromeService
-            from webdriver_manager.chrome import ChromeDriverManager
             from selenium.webdriver.common.by import By
             from selenium.webdriver.support.ui import WebDriverWait
             from selenium.webdriver.support import expected_conditions as EC
             import json
 
-            options = webdriver.ChromeOptions()
-            options.add_argument("--headless")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.0.0 Safari/537.36")
-
-            if https_proxy: # Assuming HTTPS_PROXY is used for Selenium
-                options.add_argument(f'--proxy-server={https_proxy}')
+            # Browsers are started once and reused across lookups
+            with get_pool(https_proxy).driver() as driver: # Assuming HTTPS_PROXY is used for Selenium
+                if verbose:
+                    print(f"INFO: Navigating to HIBP for {email}...")
+                driver.get(HIBP_UNIFIED_URL.format(account=email))
 
-            driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
+                wait = WebDriverWait(driver, 15)
+                pre_element = wait.until(EC.presence_of_element_located((By.TAG_NAME, "pre")))
 
-            print(f"INFO: Navigating to HIBP for {email}...")
-            driver.get(HIBP_UNIFIED_URL.format(account=email))
-
-            wait = WebDriverWait(driver, 15)
-            pre_element = wait.until(EC.presence_of_element_located((By.TAG_NAME, "pre")))
-            
-            breaches_json = pre_element.text
-            data = json.loads(breaches_json)
-            
-            driver.quit()
+                breaches_json = pre_element.text
+                data = json.loads(breaches_json)
 
             return {"breaches": data.get("Breaches", [])}
 
         except Exception as e:
-            if 'driver' in locals() and driver:
-                driver.quit()
             return {"error": f"An error occurred with Selenium: {e}"}
+
+async def check_email_breach_async(email, session=None):
+    """API lookup paced to the key's rate limit; without a key it falls back to the browser pool."""
+    settings = get_settings()
+    api_key = settings.hibp_api_key
+    if not api_key:
+        # Every thread beyond the pool size would just block on a browser, starving other to_thread callers
+        async with _browser_slot():
+            return await asyncio.to_thread(check_email_breach, email, False)
+
+    session = session or get_session()
+
+    async def handle(response):
+        if response.status == 200:
+            return {"breaches": await response.json()}
+        elif response.status == 404:
+            return {"breaches": []} # No breaches found
+        return {"error": f"API returned status code {response.status}"}
+
+    try:
+        # 429s are retried after the Retry-After delay HIBP sends
+        return await _hibp_scheduler(settings.hibp_requests_per_minute).request(
+            session, "GET", HIBP_API_URL.format(account=email), handle,
+            headers={"hibp-api-key": api_key}, params=HIBP_PARAMS, timeout=30)
+    except RateLimitedError:
+        return {"error": "API rate limit exceeded after retries"}
+    except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+        return {"error": f"An error occurred during API request: {e}"}
+
+async def check_email_breaches(emails, on_result=None, concurrency=BULK_CONCURRENCY):
+    """
+    Checks many emails against HIBP. Addresses are normalized and de-duplicated first, then
+    queued through the shared paced scheduler. Returns {normalized email: result} and calls
+    `on_result(email, result)` as each lookup finishes.
+    """
+    unique = list(dict.fromkeys(normalize_email(email) for email in emails if email.strip()))
+    results = {}
+    queue = asyncio.Queue()
+    for email in unique:
+        queue.put_nowait(email)
+
+    async def worker():
+        while not queue.empty():
+            email = queue.get_nowait()
+            results[email] = await check_email_breach_async(email)
+            if on_result:
+                on_result(email, results[email])
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(unique)) or 1)))
+    return results
+
+def sha1_hex(candidate):
+    candidate = candidate.strip()
+    if len(candidate) == 40 and all(c in "0123456789abcdefABCDEF" for c in candidate):
+        return candidate.upper()
+    return hashlib.sha1(candidate.encode("utf-8")).hexdigest().upper()
+
+async def check_pwned_passwords(candidates, session=None):
+    """
+    Looks up passwords (or their SHA-1 hex digests) with the Pwned Passwords k-anonymity range
+    API. Candidates are grouped by their 5-character hash prefix so one query covers all
+    candidates sharing it, and only the prefix ever leaves this machine. Returns
+    {candidate: times seen in breaches} (0 when not found, None when the query failed).
+    """
+    session = session or get_session()
+    scheduler = get_scheduler()
+    by_prefix = {}
+    for candidate in dict.fromkeys(candidates):
+        digest = sha1_hex(candidate)
+        by_prefix.setdefault(digest[:5], []).append((candidate, digest[5:]))
+
+    results = {}
+
+    async def handle(response):
+        response.raise_for_status()
+        counts = {}
+        for line in (await response.text()).splitlines():
+            suffix, _, count = line.partition(":")
+            counts[suffix.strip()] = int(count or 0)
+        return counts
+
+    async def query(prefix, entries):
+        try:
+            # Padding hides how many real suffixes share the prefix from anyone watching the response size
+            counts = await scheduler.request(session, "GET", PWNED_RANGE_URL.format(prefix=prefix), handle,
+                                             headers={"Add-Padding": "true"}, timeout=30)
+        except (RateLimitedError, asyncio.TimeoutError, aiohttp.ClientError):
+            counts = None
+        for candidate, suffix in entries:
+            results[candidate] = None if counts is None else counts.get(suffix, 0)
+
+    await asyncio.gather(*(query(prefix, entries) for prefix, entries in by_prefix.items()))
+    return results
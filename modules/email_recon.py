@@ -1,82 +1,82 @@
 import asyncio
 import aiohttp
-import json
 import re
-import configparser
+import time
 
-async def check_email_registration(session, site, email):
-    url = site["url"].format(email=email)
-    method = site.get("method", "GET")
-    headers = site.get("headers", {})
-    data = site.get("data")
-    success_regex = site.get("success_regex")
-    fail_regex = site.get("fail_regex")
+from modules.http_client import get_session, scan_body
+from modules.journal import journaled
+from modules.metrics import metrics, probe_context
+from modules.ratelimit import get_scheduler, RateLimitedError
+from modules.settings import get_settings
+from modules.sites import load_email_sites
 
-    # Add a default User-Agent header if not present
-    if "User-Agent" not in headers:
-        headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.0.0 Safari/537.36"
+# Fallback hints used when a site's own patterns match neither way
+FALLBACK_HINTS = {
+    "account": re.compile(r"account|user", re.IGNORECASE),
+    "found": re.compile(r"found|exists", re.IGNORECASE),
+    "missing": re.compile(r"not found|does not exist", re.IGNORECASE),
+}
+
+def _verdict_reached(matched):
+    return "success" in matched or "fail" in matched
+
+async def check_email_registration(session, site, email, scheduler=None):
+    started = time.perf_counter()
+    result = await _check_email_registration(session, site, email, scheduler)
+    metrics.probe("email_recon", site.name, time.perf_counter() - started, result[2])
+    return result
+
+async def _check_email_registration(session, site, email, scheduler=None):
+    url = site.url_for(email)
 
     try:
-        if method == "POST":
-            if data:
-                # Check if data is meant to be JSON
-                if "application/json" in headers.get("Content-Type", ""):
-                    payload = json.loads(data.format(email=email))
-                    async with session.post(url, headers=headers, json=payload, timeout=10) as response:
-                        text = await response.text()
-                else:
-                    payload = data.format(email=email)
-                    async with session.post(url, headers=headers, data=payload, timeout=10) as response:
-                        text = await response.text()
-            else:
-                async with session.post(url, headers=headers, timeout=10) as response:
-                    text = await response.text()
-        else: # GET
-            params = site.get("params", {})
-            for key, value in params.items():
-                params[key] = value.format(email=email)
-            async with session.get(url, headers=headers, params=params, timeout=10) as response:
-                text = await response.text()
+        request_kwargs = site.request_kwargs(email)
+        request_kwargs["timeout"] = get_settings().probe_timeout
+        request_kwargs["trace_request_ctx"] = probe_context("email_recon", site.name)
 
-        if success_regex and re.search(success_regex, text):
-            return site["name"], url, True
-        elif fail_regex and re.search(fail_regex, text):
-            return site["name"], url, False
-        else:
-            # If no specific regex matches, try to infer from status code or general content
-            if response.status == 200 and ("account" in text.lower() or "user" in text.lower()) and ("found" in text.lower() or "exists" in text.lower()):
-                return site["name"], url, True
-            elif response.status == 404 or "not found" in text.lower() or "does not exist" in text.lower():
-                return site["name"], url, False
-            return site["name"], url, "Unknown"
+        patterns = dict(FALLBACK_HINTS)
+        if site.success_pattern:
+            patterns["success"] = site.success_pattern
+        if site.fail_pattern:
+            patterns["fail"] = site.fail_pattern
 
+        async def handle(response):
+            # The body is matched while it streams in; reading stops at the first verdict or max_bytes
+            matched = await scan_body(response, patterns, _verdict_reached, site.max_bytes)
+
+            if "success" in matched:
+                return site.name, url, True
+            elif "fail" in matched:
+                return site.name, url, False
+            else:
+                # If no specific regex matches, try to infer from status code or general content
+                if response.status == 200 and "account" in matched and "found" in matched:
+                    return site.name, url, True
+                elif response.status == 404 or "missing" in matched:
+                    return site.name, url, False
+                return site.name, url, "Unknown"
+
+        # Paced per host and retried on throttling/transient failures instead of reporting "not found"
+        return await (scheduler or get_scheduler()).request(session, site.method, url, handle, **request_kwargs)
+    except RateLimitedError:
+        return site.name, url, "RateLimited"
     except asyncio.TimeoutError:
-        return site["name"], url, "Timeout"
+        return site.name, url, "Timeout"
     except aiohttp.ClientError:
-        return site["name"], url, "Error"
+        return site.name, url, "Error"
     except Exception as e:
-        return site["name"], url, f"Exception: {e}"
-
-async def search_email_registrations(email):
-    config = configparser.ConfigParser()
-    config.read('config.ini')
+        return site.name, url, f"Exception: {e}"
 
-    proxy = None
-    if config.has_section('PROXY'):
-        http_proxy = config['PROXY'].get('HTTP_PROXY')
-        https_proxy = config['PROXY'].get('HTTPS_PROXY')
-        if https_proxy:
-            proxy = https_proxy
-        elif http_proxy:
-            proxy = http_proxy
+async def search_email_registrations(email, session=None, journal=None, sites=None):
+    # Pooled session; proxy, keep-alive and per-host limits are configured in http_client
+    session = session or get_session()
 
-    with open("email_recon_sites.json") as f:
-        sites = json.load(f)["sites"]
+    sites = sites or load_email_sites()
 
     results = []
-    async with aiohttp.ClientSession(proxy=proxy) as session:
-        tasks = [check_email_registration(session, site, email) for site in sites]
-        responses = await asyncio.gather(*tasks)
-        for result in responses:
-            results.append(result)
+    tasks = [journaled(journal, "email_recon", email, site.name, lambda site=site: check_email_registration(session, site, email))
+             for site in sites]
+    responses = await asyncio.gather(*tasks)
+    for result in responses:
+        results.append(result)
     return results
@@ -0,0 +1,100 @@
+import asyncio
+
+import dns.resolver
+
+from modules.dns_cache import dns_cache
+from modules.domain import get_dmarc_async, spf_records
+from modules.metrics import metrics
+from modules.result_cache import normalize_email
+from modules.settings import get_settings
+
+DEFAULT_CONCURRENCY = 50
+
+# Verdicts of a domain that cannot receive mail; its addresses are not worth probing
+DEAD_VERDICTS = ("nxdomain", "no_mail")
+
+# Throwaway mailbox providers; addresses there rarely belong to a lasting account
+DISPOSABLE_DOMAINS = frozenset({
+    "10minutemail.com", "20minutemail.com", "burnermail.io", "discard.email", "dispostable.com",
+    "emailondeck.com", "fakeinbox.com", "getairmail.com", "getnada.com", "guerrillamail.com",
+    "guerrillamail.net", "guerrillamailblock.com", "harakirimail.com", "incognitomail.org",
+    "mailcatch.com", "maildrop.cc", "mailinator.com", "mailnesia.com", "mintemail.com",
+    "mohmal.com", "mytemp.email", "sharklasers.com", "spamgourmet.com", "temp-mail.org",
+    "tempail.com", "tempmail.net", "tempmailo.com", "throwawaymail.com", "trashmail.com",
+    "trashmail.de", "yopmail.com", "yopmail.fr",
+})
+
+def email_domain(email):
+    return normalize_email(email).rpartition("@")[2]
+
+def _null_mx(records):
+    # RFC 7505: a single "0 ." MX record says the domain accepts no mail
+    return len(records) == 1 and records[0].split()[-1] == "."
+
+async def _resolve(name, rtype, semaphore):
+    async with semaphore:
+        with metrics.timed("email_triage", "dns_lookup", rtype):
+            return await dns_cache.resolve(name, rtype, lifetime=get_settings().dns_timeout)
+
+async def triage_domain(domain, semaphore=None):
+    """
+    Decides from DNS alone whether `domain` can receive mail. Returns a report with its MX,
+    SPF and DMARC records and a verdict: "ok", "disposable", "nxdomain", "no_mail" (null MX,
+    or neither MX nor an address to fall back to) or "unknown" when DNS did not answer.
+    """
+    semaphore = semaphore or asyncio.Semaphore(DEFAULT_CONCURRENCY)
+    report = {"domain": domain, "verdict": "ok", "mx": [], "spf": [], "dmarc": [], "error": None}
+    if domain in DISPOSABLE_DOMAINS:
+        report["verdict"] = "disposable"
+        return report
+
+    async def optional(lookup):
+        # Missing or failed lookups here only leave a record list empty; they never decide the verdict
+        try:
+            return await lookup
+        except Exception:
+            return []
+
+    # SPF and DMARC go out with the MX query rather than after it
+    txt_task = asyncio.ensure_future(optional(_resolve(domain, "TXT", semaphore)))
+    dmarc_task = asyncio.ensure_future(optional(get_dmarc_async(domain, semaphore)))
+    try:
+        try:
+            report["mx"] = sorted(await _resolve(domain, "MX", semaphore), key=lambda r: int(r.split()[0]))
+        except dns.resolver.NoAnswer:
+            # RFC 5321 implicit MX: without MX records mail goes to the domain's own address
+            if not (await optional(_resolve(domain, "A", semaphore)) or await optional(_resolve(domain, "AAAA", semaphore))):
+                report["verdict"] = "no_mail"
+        if _null_mx(report["mx"]):
+            report["verdict"] = "no_mail"
+    except dns.resolver.NXDOMAIN:
+        report["verdict"] = "nxdomain"
+    except Exception as e:
+        report["verdict"] = "unknown"
+        report["error"] = str(e) or type(e).__name__
+    report["spf"] = spf_records(await txt_task)
+    report["dmarc"] = await dmarc_task
+    return report
+
+async def triage_emails(emails, concurrency=DEFAULT_CONCURRENCY, on_result=None):
+    """
+    Groups addresses by domain and triages every domain once, all concurrently with at most
+    `concurrency` DNS queries in flight. Returns {domain: report}, each report also carrying
+    the domain's "addresses"; `on_result(report)` is called as each domain finishes.
+    """
+    by_domain = {}
+    for email in emails:
+        if email.strip():
+            by_domain.setdefault(email_domain(email), set()).add(normalize_email(email))
+    semaphore = asyncio.Semaphore(concurrency)
+    reports = {}
+
+    async def triage(domain):
+        report = await triage_domain(domain, semaphore)
+        report["addresses"] = len(by_domain[domain])
+        reports[domain] = report
+        if on_result:
+            on_result(report)
+
+    await asyncio.gather(*(triage(domain) for domain in by_domain))
+    return reports
@@ -0,0 +1,104 @@
+import asyncio
+import codecs
+import weakref
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.metrics import metrics, trace_config
+from modules.settings import get_settings
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.0.0 Safari/537.36"
+
+# Connection pool settings shared by every HTTP module; the pool sizes are in [LIMITS] of config.ini
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+# Body streaming: bytes read per chunk, default cap per response, and how much text
+# from the previous chunk is kept so matches spanning a chunk boundary are still found
+CHUNK_SIZE = 16384
+MAX_BODY_BYTES = 262144
+SCAN_OVERLAP = 1024
+# Unread bodies up to this size are drained so the connection can go back to the pool
+DRAIN_LIMIT = 16384
+
+# One aiohttp session per event loop; sessions cannot be shared across loops
+_sessions = weakref.WeakKeyDictionary()
+_requests_session = None
+
+def get_proxies():
+    """Returns the configured proxies as a requests-style {'http': ..., 'https': ...} dict."""
+    return get_settings().proxies
+
+def get_session():
+    """
+    Returns the pooled aiohttp session for the running event loop, creating it on first use.
+    Proxy and pool size changes in config.ini apply to sessions created after the change.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        settings = get_settings()
+        connector = aiohttp.TCPConnector(
+            limit=settings.connection_limit,
+            limit_per_host=settings.connection_limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        session = aiohttp.ClientSession(connector=connector, proxy=settings.proxy, headers={"User-Agent": USER_AGENT},
+                                        trace_configs=[trace_config()] if metrics.enabled else None)
+        _sessions[loop] = session
+    return session
+
+async def close_session():
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+def get_requests_session():
+    """Returns the pooled requests session used by the blocking HTTP modules."""
+    global _requests_session
+    if _requests_session is None:
+        settings = get_settings()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.connection_limit_per_host, pool_maxsize=settings.connection_limit_per_host)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        session.proxies.update(settings.proxies)
+        _requests_session = session
+    return _requests_session
+
+async def scan_body(response, patterns, done=None, max_bytes=MAX_BODY_BYTES):
+    """
+    Streams the response body and searches it for each compiled pattern in `patterns`
+    (a name -> pattern dict) as chunks arrive. Returns the set of names that matched.
+    Reading stops early once `done(matched)` is true or `max_bytes` have been read.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    matched = set()
+    tail = ""
+    read = 0
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        read += len(chunk)
+        text = tail + decoder.decode(chunk)
+        for name, pattern in patterns.items():
+            if name not in matched and pattern.search(text):
+                matched.add(name)
+        if (done and done(matched)) or read >= max_bytes:
+            break
+        tail = text[-SCAN_OVERLAP:]
+    return matched
+
+async def discard_body(response):
+    """Finishes with a response whose body is not needed without downloading large pages."""
+    if response.content_length is not None and response.content_length <= DRAIN_LIMIT:
+        # Small bodies are cheaper to drain than a new TCP/TLS handshake next time
+        await response.read()
+    else:
+        response.close()
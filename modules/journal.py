@@ -0,0 +1,116 @@
+import json
+import os
+
+from modules.result_cache import normalize_target, is_cacheable
+
+# A unit with this site is the whole target, for modules that are not split per site or stage
+WHOLE_TARGET = None
+
+class Journal:
+    """
+    Append-only log of finished work units so an interrupted run only redoes what was left.
+    A unit is one (module, target, site) probe: one site for username and email registration
+    searches, one stage for domain analysis, or the whole target for the other modules. Each
+    line is a compact JSON array, either [module, target, site, result] for a finished unit or
+    [module, target] once the target's records have been written to the output.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.replayed = 0
+        self.recorded = 0
+        # Units are only kept for targets still in progress; finished targets are just a key
+        self._units = {}
+        self._done = set()
+        dropped = self._load()
+        if dropped > len(self._units):
+            self._compact()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        lines = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # Torn last line from a crash mid-write
+                    lines += 1
+                    if len(entry) == 2:
+                        self._finish(*entry)
+                    elif (entry[0], entry[1]) not in self._done:
+                        self._units[tuple(entry[:3])] = entry[3]
+        except FileNotFoundError:
+            pass
+        return lines - len(self._units) - len(self._done)
+
+    def _compact(self):
+        # Rewrite without the units of finished targets; the rename keeps the old file until the new one is complete
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key in self._done:
+                f.write(_encode(list(key)))
+            for key, result in self._units.items():
+                f.write(_encode([*key, result]))
+        os.replace(tmp, self.path)
+
+    def _finish(self, module, target):
+        self._done.add((module, target))
+        for key in [key for key in self._units if key[:2] == (module, target)]:
+            del self._units[key]
+
+    def get(self, module, target, site=WHOLE_TARGET):
+        """Returns (found, result) for a unit finished by an earlier run."""
+        key = (module, normalize_target(module, target), site)
+        if key in self._units:
+            self.replayed += 1
+            return True, self._units[key]
+        return False, None
+
+    def record(self, module, target, site, result):
+        key = (module, normalize_target(module, target), site)
+        self._units[key] = result
+        self._file.write(_encode([*key, result]))
+        self._file.flush()
+        self.recorded += 1
+
+    def is_done(self, module, target):
+        return (module, normalize_target(module, target)) in self._done
+
+    def mark_done(self, module, target):
+        """Records that the target's output has been written; its units are no longer needed."""
+        key = (module, normalize_target(module, target))
+        self._finish(*key)
+        self._file.write(_encode(list(key)))
+        self._file.flush()
+
+    def stats(self):
+        return {"replayed": self.replayed, "recorded": self.recorded, "done": len(self._done)}
+
+    def close(self):
+        self._file.close()
+
+def _encode(entry):
+    return json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+
+def _finished(module, site, result):
+    # Transient failures are not journaled so they are retried on resume
+    if site is WHOLE_TARGET:
+        return is_cacheable(module, result)
+    return is_cacheable(module, [result])
+
+async def journaled(journal, module, target, site, run, finished=None):
+    """
+    Returns the journaled result of a unit, or awaits run() and journals its result
+    if finished(result) says it is a real answer rather than a failure worth retrying.
+    """
+    if journal is None:
+        return await run()
+    found, result = journal.get(module, target, site)
+    if found:
+        return result
+    result = await run()
+    if finished(result) if finished else _finished(module, site, result):
+        journal.record(module, target, site, result)
+    return result
@@ -0,0 +1,188 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Histogram bucket bounds in seconds, shared by every phase
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_TOP = 10
+
+class Histogram:
+    __slots__ = ("count", "sum", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "sum": round(self.sum, 6), "mean": round(self.mean, 6), "max": round(self.max, 6)}
+
+def status_label(status):
+    if status is True:
+        return "found"
+    if status is False:
+        return "not_found"
+    # "Exception: <message>" would give every distinct error its own label
+    return str(status).split(":")[0]
+
+class Metrics:
+    """
+    Per-phase timings of the probes. A phase is one step of a probe, e.g. "dns", "connect" or
+    "request" of an HTTP request, or "whois" and "tls_handshake" of a domain analysis.
+    Durations are kept per (module, phase) and per (module, site) so a slow scan can be
+    blamed on DNS, handshakes, pacing or one particular site. Recording is off until enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._phases = {} # (module, phase) -> Histogram
+        self._sites = {} # (module, site, phase) -> Histogram
+        self._statuses = Counter() # (module, status) -> count
+
+    def observe(self, module, phase, seconds, site=None):
+        if not self.enabled:
+            return
+        key = (module, phase)
+        histogram = self._phases.get(key)
+        if histogram is None:
+            histogram = self._phases[key] = Histogram()
+        histogram.observe(seconds)
+        if site is not None:
+            key = (module, site, phase)
+            histogram = self._sites.get(key)
+            if histogram is None:
+                histogram = self._sites[key] = Histogram()
+            histogram.observe(seconds)
+
+    def probe(self, module, site, seconds, status):
+        """Records a finished probe: its total duration and how it ended."""
+        if not self.enabled:
+            return
+        self.observe(module, "total", seconds, site)
+        self._statuses[(module, status_label(status))] += 1
+
+    @contextmanager
+    def timed(self, module, phase, site=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(module, phase, time.perf_counter() - started, site)
+
+    def summary(self):
+        return {
+            "phases": [{"module": m, "phase": p, **h.to_dict()} for (m, p), h in sorted(self._phases.items())],
+            "sites": [{"module": m, "site": s, "phase": p, **h.to_dict()} for (m, s, p), h in sorted(self._sites.items())],
+            "statuses": [{"module": m, "status": s, "count": c} for (m, s), c in sorted(self._statuses.items())],
+        }
+
+    def prometheus(self):
+        """Renders the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP saki_phase_seconds Duration of one probe phase.",
+            "# TYPE saki_phase_seconds histogram",
+        ]
+        for (module, phase), histogram in sorted(self._phases.items()):
+            labels = f'module="{module}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'saki_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'saki_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"saki_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"saki_phase_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP saki_site_seconds Duration of one probe phase per site.",
+            "# TYPE saki_site_seconds summary",
+        ]
+        for (module, site, phase), histogram in sorted(self._sites.items()):
+            labels = f'module="{module}",site="{_escape(site)}",phase="{phase}"'
+            lines.append(f"saki_site_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"saki_site_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP saki_probes_total Finished probes by outcome.",
+            "# TYPE saki_probes_total counter",
+        ]
+        for (module, status), count in sorted(self._statuses.items()):
+            lines.append(f'saki_probes_total{{module="{module}",status="{_escape(status)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes a JSON summary for .json paths, Prometheus text otherwise."""
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.summary(), f, indent=2)
+            else:
+                f.write(self.prometheus())
+
+    def profile(self, top=PROFILE_TOP):
+        """Returns report lines naming the slowest phases and sites."""
+        lines = ["[*] Slowest phases (mean / max seconds, count):"]
+        phases = sorted(self._phases.items(), key=lambda item: item[1].mean, reverse=True)
+        for (module, phase), h in phases[:top]:
+            lines.append(f"    {module:<12} {phase:<16} {h.mean:8.3f} {h.max:8.3f} {h.count:>7}")
+        lines.append("[*] Slowest sites by total probe time (mean / max seconds, count):")
+        sites = sorted(((key, h) for key, h in self._sites.items() if key[2] == "total"),
+                       key=lambda item: item[1].mean, reverse=True)
+        for (module, site, _), h in sites[:top]:
+            lines.append(f"    {module:<12} {site:<24} {h.mean:8.3f} {h.max:8.3f} {h.count:>7}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def probe_context(module, site):
+    """Request context naming the probe, passed to aiohttp as trace_request_ctx."""
+    return SimpleNamespace(module=module, site=site)
+
+def trace_config():
+    """
+    aiohttp tracing hooks that time the phases of each request: "pool_wait" for a free
+    connection, "dns", "connect" (TCP and TLS handshake, through the proxy when one is set)
+    and "request" from the start of the request, including those phases, to the response headers.
+    """
+    # Imported here: every run imports metrics, but only HTTP lookups need aiohttp
+    import aiohttp
+    config = aiohttp.TraceConfig()
+
+    def timer(phase):
+        async def start(session, ctx, params):
+            setattr(ctx, phase, time.perf_counter())
+
+        async def end(session, ctx, params):
+            started = getattr(ctx, phase, None)
+            probe = ctx.trace_request_ctx
+            if started is not None and probe is not None:
+                metrics.observe(probe.module, phase, time.perf_counter() - started, probe.site)
+        return start, end
+
+    for phase, (on_start, on_end) in (
+        ("pool_wait", (config.on_connection_queued_start, config.on_connection_queued_end)),
+        ("dns", (config.on_dns_resolvehost_start, config.on_dns_resolvehost_end)),
+        ("connect", (config.on_connection_create_start, config.on_connection_create_end)),
+        ("request", (config.on_request_start, config.on_request_end)),
+    ):
+        start, end = timer(phase)
+        on_start.append(start)
+        on_end.append(end)
+    return config
+
+metrics = Metrics()
@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field, asdict
+from typing import Any, List, Optional, Union
+
+# True/False for a definite answer, otherwise a status string such as "Timeout" or "RateLimited"
+Status = Union[bool, str]
+
+@dataclass(slots=True)
+class SiteResult:
+    """One site's answer for a username search or an email registration probe."""
+    module: str
+    target: str
+    site: str
+    url: str
+    status: Status
+
+@dataclass(slots=True)
+class BreachResult:
+    target: str
+    breaches: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+    module: str = "email_breach"
+
+@dataclass(slots=True)
+class EmailDomainResult:
+    """DNS triage of the domain behind a group of email addresses."""
+    target: str
+    verdict: str
+    mx: List[str] = field(default_factory=list)
+    spf: List[str] = field(default_factory=list)
+    dmarc: List[str] = field(default_factory=list)
+    addresses: int = 0
+    error: Optional[str] = None
+    module: str = "email_domain"
+
+    @classmethod
+    def from_report(cls, report):
+        report = dict(report)
+        return cls(report.pop("domain"), **report)
+
+@dataclass(slots=True)
+class PhoneResult:
+    target: str
+    valid: bool = False
+    country_code: Optional[int] = None
+    national_number: Optional[int] = None
+    carrier: Optional[str] = None
+    location: Optional[str] = None
+    online_mentions: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    e164: Optional[str] = None
+    module: str = "phone"
+
+@dataclass(slots=True)
+class DomainResult:
+    target: str
+    whois: Any = None
+    dns: dict = field(default_factory=dict)
+    subdomains: List[str] = field(default_factory=list)
+    ssl_tls_versions: List[str] = field(default_factory=list)
+    private_ip_warning: bool = False
+    # One scan_host report per host: apex first, then the resolved subdomains
+    tls: List[dict] = field(default_factory=list)
+    # discover_dkim report: the keys found with their parsed metadata and the provider they name
+    dkim: dict = field(default_factory=dict)
+    module: str = "domain"
+
+@dataclass(slots=True)
+class DKIMResult:
+    """One DKIM key found under `selector`, with its parsed metadata."""
+    target: str
+    selector: str
+    provider: Optional[str] = None
+    key_type: str = "rsa"
+    bits: Optional[int] = None
+    hashes: List[str] = field(default_factory=list)
+    flags: List[str] = field(default_factory=list)
+    testing: bool = False
+    revoked: bool = False
+    error: Optional[str] = None
+    record: str = ""
+    module: str = "dkim"
+
+@dataclass(slots=True)
+class SubdomainResult:
+    target: str
+    subdomain: str
+    addresses: List[str] = field(default_factory=list)
+    module: str = "subdomains"
+
+@dataclass(slots=True)
+class TLSResult:
+    """TLS scan of one host: accepted versions with their ciphers, the certificate and whether it is trusted."""
+    target: str
+    address: Optional[str] = None
+    port: int = 443
+    versions: dict = field(default_factory=dict)
+    certificate: Optional[dict] = None
+    chain: List[str] = field(default_factory=list)
+    trusted: Optional[bool] = None
+    trust_error: Optional[str] = None
+    error: Optional[str] = None
+    module: str = "tls"
+
+    @classmethod
+    def from_report(cls, report):
+        report = dict(report)
+        return cls(report.pop("host"), **report)
+
+@dataclass(slots=True)
+class PasswordResult:
+    """Pwned Passwords range lookup; `target` is the SHA-1 so plaintext never reaches the output."""
+    target: str
+    pwned_count: Optional[int] = None
+    module: str = "pwned_passwords"
+
+@dataclass(slots=True)
+class ErrorResult:
+    """A lookup that failed as a whole before the module could return anything."""
+    module: str
+    target: str
+    error: str
+
+def to_dict(record):
+    return asdict(record)
+
+def records_from_result(module, target, result):
+    """Converts a module's raw return value into a list of typed records."""
+    if module in ("username", "email_recon"):
+        return [SiteResult(module, target, site, url, status) for site, url, status in result]
+    if module == "email_breach":
+        if isinstance(result, list): # Results cached before breaches were wrapped in a dict
+            result = {"breaches": result}
+        return [BreachResult(target, result.get("breaches") or [], result.get("error"))]
+    if module == "phone":
+        return [PhoneResult(target, bool(result.get("valid")), result.get("country_code"), result.get("national_number"),
+                            result.get("carrier"), result.get("location"), result.get("online_mentions") or [],
+                            result.get("error"), result.get("e164"))]
+    if module == "domain":
+        return [DomainResult(target, result.get("whois"), result.get("dns") or {}, result.get("subdomains") or [],
+                             result.get("ssl_tls_versions") or [], bool(result.get("private_ip_warning")),
+                             result.get("tls") or [], result.get("dkim") or {})]
+    raise ValueError(f"Unknown module: {module}")
@@ -0,0 +1,96 @@
+import csv
+import json
+import re
+import sys
+from dataclasses import fields
+
+from modules.models import SiteResult, to_dict
+
+FORMATS = ("text", "jsonl", "csv")
+CSV_COLUMNS = ("module", "target", "site", "url", "status", "data")
+# SiteResult rows get their own CSV columns instead of a JSON blob
+SITE_FIELDS = {f.name for f in fields(SiteResult)} - {"module", "target"}
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+def strip_ansi(text):
+    return ANSI_ESCAPE.sub("", text)
+
+def infer_format(path):
+    if path and path.endswith((".jsonl", ".json", ".ndjson")):
+        return "jsonl"
+    if path and path.endswith(".csv"):
+        return "csv"
+    return "text"
+
+class ResultWriter:
+    """
+    Streams results to one buffered file handle that stays open for the whole run.
+    "jsonl" and "csv" write typed records; "text" writes rendered lines with colors stripped.
+    """
+
+    def __init__(self, path=None, fmt=None, flush_every=1):
+        self.format = fmt or infer_format(path)
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown output format: {self.format}")
+        self._owns_stream = bool(path and path != "-")
+        self._stream = open(path, "a", newline="", buffering=1 << 16) if self._owns_stream else sys.stdout
+        self._flush_every = flush_every
+        self._pending = 0
+        self._csv = None
+        if self.format == "csv":
+            self._csv = csv.writer(self._stream)
+            if not self._owns_stream or self._stream.tell() == 0:
+                self._csv.writerow(CSV_COLUMNS)
+
+    def _written(self):
+        # Flushing per record keeps output streaming; larger batches trade latency for throughput
+        self._pending += 1
+        if self._pending >= self._flush_every:
+            self._stream.flush()
+            self._pending = 0
+
+    def write_record(self, record):
+        self.write_dict(to_dict(record))
+
+    def write_dict(self, data):
+        """Writes a record already converted to a dict, e.g. one read back from a JSON Lines shard."""
+        if self.format == "jsonl":
+            self._stream.write(json.dumps(data, default=str) + "\n")
+        elif self.format == "csv":
+            data = dict(data)
+            module, target = data.pop("module"), data.pop("target")
+            if data.keys() == SITE_FIELDS:
+                row = (module, target, data["site"], data["url"], data["status"], "")
+            else:
+                row = (module, target, "", "", "", json.dumps(data, default=str))
+            self._csv.writerow(row)
+        else:
+            return # Text output is written from the rendered lines instead
+        self._written()
+
+    def write_records(self, records):
+        for record in records:
+            self.write_record(record)
+
+    def write_lines(self, lines):
+        if self.format != "text":
+            return
+        self._stream.write("\n".join(strip_ansi(line) for line in lines) + "\n")
+        self._written()
+
+    def flush(self):
+        self._stream.flush()
+        self._pending = 0
+
+    def close(self):
+        if self._owns_stream:
+            self._stream.close()
+        else:
+            self._stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,51 +1,173 @@
+import asyncio
+import urllib.request
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
 import phonenumbers
-import requests
-from googlesearch import search
-import configparser
-import os
+from phonenumbers import carrier, geocoder
+import googlesearch
+
+from modules.ratelimit import TokenBucket
+from modules.settings import get_settings
+
+# Google answers bursts with CAPTCHAs, so searches are paced across all numbers
+# ([LIMITS] MENTIONS_PER_MINUTE) instead of sleeping after each one
+MENTION_CONCURRENCY = 4
+MENTION_RESULTS = 5
+# Numbers per task sent to a worker process; small lists are analyzed in-process
+CHUNK_SIZE = 2000
+MIN_PARALLEL = 5000
+
+_mention_buckets = weakref.WeakKeyDictionary()
+_openers = {} # proxies -> urllib opener
 
-def check_phone_number(phone_number):
+def _use_proxies(proxies):
+    """
+    googlesearch fetches pages with urllib's urlopen, which would otherwise only find proxies in
+    os.environ. It gets an opener of its own instead, so no other library sees these proxies.
+    """
+    key = tuple(sorted(proxies.items()))
+    opener = _openers.get(key)
+    if opener is None:
+        opener = _openers[key] = urllib.request.build_opener(urllib.request.ProxyHandler(proxies))
+    googlesearch.urlopen = opener.open
+
+def warm_metadata():
+    """
+    Loads the numbering plan, carrier and geocoding metadata of every region up front.
+    phonenumbers otherwise loads each region's files on the first number from it,
+    which a worker would repeat for every region it meets.
+    """
+    for region in phonenumbers.SUPPORTED_REGIONS:
+        example = phonenumbers.example_number(region)
+        if example:
+            carrier.name_for_number(example, "en")
+            geocoder.description_for_number(example, "en")
+    for country_code in phonenumbers.COUNTRY_CODES_FOR_NON_GEO_REGIONS:
+        phonenumbers.PhoneMetadata.metadata_for_nongeo_region(country_code)
+
+def analyze_number(phone_number, region=None):
+    """Offline part of the analysis: parses and validates the number and looks up its carrier and location."""
     results = {
         "valid": False,
         "country_code": None,
         "national_number": None,
         "carrier": None,
         "location": None,
-        "online_mentions": []
+        "online_mentions": [],
+        "e164": None,
     }
-
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-
-    if config.has_section('PROXY'):
-        http_proxy = config['PROXY'].get('HTTP_PROXY')
-        https_proxy = config['PROXY'].get('HTTPS_PROXY')
-        if http_proxy: os.environ['HTTP_PROXY'] = http_proxy
-        if https_proxy: os.environ['HTTPS_PROXY'] = https_proxy
-
     try:
-        parsed_number = phonenumbers.parse(phone_number)
+        parsed_number = phonenumbers.parse(phone_number, region)
+        # Set for invalid numbers too, so equal inputs in different notations still collapse
+        results["e164"] = phonenumbers.format_number(parsed_number, phonenumbers.PhoneNumberFormat.E164)
         if phonenumbers.is_valid_number(parsed_number):
             results["valid"] = True
             results["country_code"] = parsed_number.country_code
             results["national_number"] = parsed_number.national_number
-            
-            # Get carrier and location info (may not always be available)
-            from phonenumbers import carrier, geocoder
+            # Carrier and location are not available for every number
             results["carrier"] = carrier.name_for_number(parsed_number, "en")
             results["location"] = geocoder.description_for_number(parsed_number, "en")
+    except Exception as e:
+        results["error"] = str(e)
+    return results
 
-            # Search for online mentions (basic Google search)
-            query = f'\"{phone_number}\" site:.com OR site:.org OR site:.net OR site:.io'
-            print(f"[*] Searching Google for mentions of {phone_number}...")
-            try:
-                for url in search(query, num=5, stop=5, pause=2):
-                    results["online_mentions"].append(url)
-            except Exception as e:
-                results["online_mentions"].append(f"Error during Google search: {e}")
+def _mention_query(phone_number):
+    return f'\"{phone_number}\" site:.com OR site:.org OR site:.net OR site:.io'
 
+def _search_mentions(phone_number, pause):
+    _use_proxies(get_settings().proxies)
+    try:
+        return list(googlesearch.search(_mention_query(phone_number), num=MENTION_RESULTS, stop=MENTION_RESULTS, pause=pause))
     except Exception as e:
-        results["error"] = str(e)
+        return [f"Error during Google search: {e}"]
+
+def check_phone_number(phone_number, verbose=True):
+    results = analyze_number(phone_number)
+    if results["valid"]:
+        # Search for online mentions (basic Google search)
+        if verbose:
+            print(f"[*] Searching Google for mentions of {phone_number}...")
+        results["online_mentions"] = _search_mentions(phone_number, pause=2)
+    return results
+
+def _mention_bucket(rate_per_minute):
+    loop = asyncio.get_running_loop()
+    bucket = _mention_buckets.get(loop)
+    if bucket is None:
+        bucket = _mention_buckets[loop] = TokenBucket(rate_per_minute / 60)
+    elif bucket.rate != rate_per_minute / 60:
+        bucket.set_rate(rate_per_minute / 60)
+    return bucket
+
+async def search_mentions_async(phone_number, rate_per_minute=None):
+    """Google search for the number, paced by a token bucket shared by every search on this loop."""
+    await _mention_bucket(rate_per_minute or get_settings().mentions_per_minute).acquire()
+    # The bucket does the pacing, so googlesearch's own sleep is turned off
+    return await asyncio.to_thread(_search_mentions, phone_number, 0)
 
+async def check_phone_number_async(phone_number, mentions=True):
+    results = analyze_number(phone_number)
+    if mentions and results["valid"]:
+        results["online_mentions"] = await search_mentions_async(phone_number)
     return results
 
+def _analyze_chunk(numbers, region):
+    return [analyze_number(number, region) for number in numbers]
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def analyze_numbers(numbers, region=None, workers=None):
+    """
+    Analyzes a list of numbers offline and yields (number, result) once per distinct number:
+    inputs that differ only in notation are folded into the first one by their E.164 form.
+    Large lists are split into chunks analyzed by a pool of worker processes that each load
+    the metadata once at startup.
+    """
+    unique = list(dict.fromkeys(number.strip() for number in numbers if number.strip()))
+    if workers == 1 or len(unique) < MIN_PARALLEL:
+        warm_metadata()
+        analyzed = zip(unique, _analyze_chunk(unique, region))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_metadata)
+        chunks = list(_chunks(unique, CHUNK_SIZE))
+        with executor:
+            batches = executor.map(_analyze_chunk, chunks, [region] * len(chunks))
+            analyzed = list(zip(unique, (result for batch in batches for result in batch)))
+
+    seen = set()
+    for number, result in analyzed:
+        key = result["e164"] or number
+        if key not in seen:
+            seen.add(key)
+            yield number, result
+
+async def search_mentions_bulk(analyzed, rate_per_minute=None, concurrency=MENTION_CONCURRENCY, on_result=None):
+    """
+    Optional online stage of a bulk analysis: runs the mention search for each valid
+    (number, result) at `rate_per_minute` and fills in result["online_mentions"].
+    Invalid numbers are passed to `on_result` straight away.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            number, result = item
+            result["online_mentions"] = await search_mentions_async(result["e164"], rate_per_minute)
+            if on_result:
+                on_result(number, result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for number, result in analyzed:
+        if result["valid"]:
+            await queue.put((number, result))
+        elif on_result:
+            on_result(number, result)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
@@ -0,0 +1,195 @@
+import asyncio
+import random
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from modules.metrics import metrics
+from modules.settings import get_settings
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if not self.rate:
+            return # Unlimited
+        # Holding the lock while sleeping keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = rate
+
+# Responses that mean "slow down" for this host
+THROTTLE_STATUSES = (429, 503)
+# Responses worth retrying without penalizing the host's rate
+TRANSIENT_STATUSES = (500, 502, 504)
+
+MIN_HOST_RATE = 0.2
+MAX_IN_FLIGHT = 200
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 30.0
+MAX_RETRY_AFTER = 120.0
+
+class RateLimitedError(Exception):
+    """Raised when a host keeps throttling a request after all retries."""
+
+    def __init__(self, url, status):
+        super().__init__(f"{url} still returned {status} after retries")
+        self.url = url
+        self.status = status
+
+def parse_retry_after(value):
+    """Parses a Retry-After header (delta-seconds or HTTP-date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+class HostScheduler:
+    """
+    Schedules HTTP requests with an adaptive token bucket per host, a global in-flight cap
+    and retries with jittered exponential backoff. A host's rate is halved whenever it
+    answers 429/503 (honoring Retry-After) and slowly recovers on successful responses.
+    """
+
+    def __init__(self, host_rate=None, max_in_flight=MAX_IN_FLIGHT, retries=MAX_RETRIES,
+                 min_rate=MIN_HOST_RATE):
+        self.host_rate = host_rate or get_settings().host_rate
+        self.min_rate = min_rate
+        self.retries = retries
+        self._buckets = {}
+        self._blocked_until = {}
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.host_rate)
+        return bucket
+
+    def _throttle(self, host, retry_after):
+        bucket = self._bucket(host)
+        bucket.set_rate(max(self.min_rate, bucket.rate / 2))
+        if retry_after:
+            self._blocked_until[host] = max(self._blocked_until.get(host, 0), time.monotonic() + retry_after)
+
+    def _recover(self, host):
+        bucket = self._bucket(host)
+        if bucket.rate < self.host_rate:
+            bucket.set_rate(min(self.host_rate, bucket.rate * 1.1))
+
+    def set_host_rate(self, host_rate, min_rate=None):
+        """Changes the target rate. Hosts already above it slow down at once; slower ones recover to it."""
+        self.host_rate = host_rate
+        if min_rate is not None:
+            self.min_rate = min_rate
+        for bucket in self._buckets.values():
+            if bucket.rate > host_rate:
+                bucket.set_rate(host_rate)
+
+    async def _wait_turn(self, host):
+        while True:
+            delay = self._blocked_until.get(host, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._bucket(host).acquire()
+            # A Retry-After may have arrived while we were queued for a token
+            if self._blocked_until.get(host, 0) <= time.monotonic():
+                return
+
+    def _backoff(self, attempt):
+        # Full jitter keeps retries from many probes from arriving in lockstep
+        return random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt))
+
+    async def request(self, session, method, url, handler, **kwargs):
+        """
+        Sends the request and returns `await handler(response)` for the first response that is
+        not throttled or transient. Raises RateLimitedError, asyncio.TimeoutError or
+        aiohttp.ClientError once retries are exhausted.
+        """
+        # Imported here so TokenBucket users (phone, DNS scans) never load aiohttp; the session
+        # passed in means it is already imported by now
+        import aiohttp
+        host = urlsplit(url).hostname or url
+        probe = kwargs.get("trace_request_ctx")
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            started = time.perf_counter()
+            await self._wait_turn(host)
+            if probe is not None:
+                # Time spent waiting on our own per-host pacing rather than on the site
+                metrics.observe(probe.module, "pacing", time.perf_counter() - started, probe.site)
+            delay = None
+            try:
+                async with self._in_flight:
+                    async with session.request(method, url, **kwargs) as response:
+                        if response.status in THROTTLE_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                            self._throttle(host, retry_after)
+                            if last_attempt:
+                                raise RateLimitedError(url, response.status)
+                            delay = retry_after
+                        elif response.status in TRANSIENT_STATUSES and not last_attempt:
+                            pass
+                        else:
+                            self._recover(host)
+                            return await handler(response)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+                if last_attempt:
+                    raise
+            # Sleep outside the in-flight slot so waiting retries don't block other hosts
+            delay = delay if delay is not None else self._backoff(attempt)
+            if probe is not None:
+                metrics.observe(probe.module, "backoff", delay, probe.site)
+            await asyncio.sleep(delay)
+
+_schedulers = weakref.WeakKeyDictionary()
+_pinned = weakref.WeakSet()
+
+def get_scheduler():
+    """Returns the shared request scheduler for the running event loop."""
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = HostScheduler()
+    elif loop not in _pinned:
+        host_rate = get_settings().host_rate
+        if scheduler.host_rate != host_rate:
+            scheduler.set_host_rate(host_rate)
+    return scheduler
+
+def set_scheduler(scheduler):
+    """Replaces the shared scheduler of the running event loop, e.g. one with different rates."""
+    loop = asyncio.get_running_loop()
+    _schedulers[loop] = scheduler
+    # Its rates were chosen by the caller, so config.ini changes leave them alone
+    _pinned.add(loop)
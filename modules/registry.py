@@ -0,0 +1,60 @@
+import importlib
+import os
+import pkgutil
+import sys
+import time
+
+from modules.metrics import metrics
+
+# Lookup -> the module implementing it. Nothing here is imported until a lookup is first run,
+# so a process only pays for the dependencies (aiohttp, dnspython, phonenumbers...) it uses.
+LOOKUPS = {
+    "username": "modules.username",
+    "email_breach": "modules.email_breach",
+    "email_recon": "modules.email_recon",
+    "phone": "modules.phone",
+    "domain": "modules.domain",
+}
+
+# Target type -> the lookups run for it in batch mode
+TARGET_MODULES = {
+    "username": ["username"],
+    "email": ["email_breach", "email_recon"],
+    "phone": ["phone"],
+    "domain": ["domain"],
+}
+
+def discover():
+    """Names of every module in the modules directory, found without importing any of them."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return sorted(f"modules.{info.name}" for info in pkgutil.iter_modules([directory]))
+
+class ModuleRegistry:
+    """Imports lookup modules on first use and records how long each import took."""
+
+    def __init__(self, lookups=LOOKUPS):
+        self.lookups = dict(lookups)
+        self.import_times = {} # lookup -> seconds its first import took
+
+    def names(self):
+        return list(self.lookups)
+
+    def load(self, name):
+        """Returns the module implementing lookup `name`, importing it now if nothing has yet."""
+        try:
+            path = self.lookups[name]
+        except KeyError:
+            raise ValueError(f"Unknown module: {name}") from None
+        module = sys.modules.get(path)
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(path)
+            self.import_times[name] = time.perf_counter() - started
+            metrics.observe("startup", "import", self.import_times[name], name)
+        return module
+
+    def loaded(self, path):
+        """The module at `path` if something already imported it, else None; for cleanup that must not import."""
+        return sys.modules.get(path)
+
+registry = ModuleRegistry()
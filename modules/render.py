@@ -0,0 +1,211 @@
+from colorama import Fore, Style
+
+# Colored terminal presentation of result records; nothing here touches the network or files,
+# nor imports the modules that do, so printing a result costs no aiohttp or dnspython import
+
+LEGACY_PROTOCOLS = ("TLSv1", "TLSv1.1")
+EXPIRY_WARNING_DAYS = 30
+
+def render_breach(record):
+    lines = []
+    if record.error:
+        lines.append(f"{Fore.RED}[!] An error occurred: {record.error}{Style.RESET_ALL}")
+    elif record.breaches:
+        lines.append(f"{Fore.GREEN}[+] Found {len(record.breaches)} breaches:{Style.RESET_ALL}")
+        for breach in record.breaches:
+            lines.append(f"  {Fore.YELLOW}----------------------------------------{Style.RESET_ALL}")
+            lines.append(f"  {Fore.RED}Name         : {breach.get('Name')}{Style.RESET_ALL}")
+            lines.append(f"  {Fore.WHITE}Domain       : {breach.get('Domain')}")
+            lines.append(f"  {Fore.WHITE}Breach Date  : {breach.get('BreachDate')}")
+            dataclasses = ", ".join(breach.get('DataClasses', []))
+            lines.append(f"  {Fore.WHITE}Data Classes : {dataclasses}")
+    else:
+        lines.append(f"{Fore.GREEN}[-] No breaches found for {record.target}.{Style.RESET_ALL}")
+    return lines
+
+def render_usernames(target, records):
+    lines = []
+    for record in records:
+        if record.status is True:
+            lines.append(f"{Fore.GREEN}[+] {record.site}: {record.url}")
+    if not lines:
+        lines.append(f"{Fore.RED}[-] No accounts found for {target}.{Style.RESET_ALL}")
+    return lines
+
+def render_registrations(target, records):
+    lines = []
+    found_count = 0
+    for record in records:
+        if record.status is True:
+            lines.append(f"{Fore.GREEN}[+] {record.site}: Registered")
+            found_count += 1
+        elif record.status is False:
+            lines.append(f"{Fore.RED}[-] {record.site}: Not Registered")
+        else:
+            lines.append(f"{Fore.YELLOW}[?] {record.site}: {record.status}")
+    if found_count == 0:
+        lines.append(f"{Fore.RED}[-] No registrations found for {target}.{Style.RESET_ALL}")
+    return lines
+
+def render_phone(record):
+    lines = []
+    if record.valid:
+        lines.append(f"{Fore.GREEN}[+] Phone number is valid.{Style.RESET_ALL}")
+        lines.append(f"  {Fore.WHITE}Country Code   : {record.country_code}")
+        lines.append(f"  {Fore.WHITE}National Number: {record.national_number}")
+        if record.carrier:
+            lines.append(f"  {Fore.WHITE}Carrier        : {record.carrier}")
+        if record.location:
+            lines.append(f"  {Fore.WHITE}Location       : {record.location}")
+
+        if record.online_mentions:
+            lines.append(f"{Fore.GREEN}[+] Found online mentions:{Style.RESET_ALL}")
+            for mention in record.online_mentions:
+                lines.append(f"  {Fore.CYAN}- {mention}{Style.RESET_ALL}")
+        else:
+            lines.append(f"{Fore.YELLOW}[-] No online mentions found.{Style.RESET_ALL}")
+    else:
+        lines.append(f"{Fore.RED}[-] Phone number is invalid or an error occurred: {record.error or 'Unknown error'}{Style.RESET_ALL}")
+    return lines
+
+WHOIS_LABELS = (
+    ("domain", "Domain"), ("registrar", "Registrar"), ("registrant", "Registrant"), ("created", "Created"),
+    ("updated", "Updated"), ("expires", "Expires"), ("dnssec", "DNSSEC"),
+)
+
+def render_whois(whois):
+    if not isinstance(whois, dict):
+        return [str(whois)] # Raw text from results cached before WHOIS records were parsed
+    if "error" in whois:
+        return [f"{Fore.RED}[!] {whois['error']}{Style.RESET_ALL}"]
+    if not whois.get("registered"):
+        return [f"{Fore.YELLOW}[-] {whois['domain']} is not registered ({whois['server']}).{Style.RESET_ALL}"]
+    lines = []
+    for key, label in WHOIS_LABELS:
+        if whois.get(key):
+            lines.append(f"  {Fore.WHITE}{label:<13}: {whois[key]}")
+    if whois.get("name_servers"):
+        lines.append(f"  {Fore.WHITE}Name Servers : {', '.join(whois['name_servers'])}")
+    if whois.get("status"):
+        lines.append(f"  {Fore.WHITE}Status       : {', '.join(whois['status'])}")
+    lines.append(f"  {Fore.WHITE}Source       : {whois['source'].upper()} ({whois['server']})")
+    return lines
+
+def render_tls(report):
+    host = f"{report['host']}:{report['port']}" if report['port'] != 443 else report['host']
+    if report["error"]:
+        return [f"  {Fore.YELLOW}- {host}: {report['error']}{Style.RESET_ALL}"]
+    versions = [name for name, result in report["versions"].items() if result.get("supported")]
+    lines = [f"  {Fore.CYAN}- {host} ({report['address']}): {', '.join(versions)}{Style.RESET_ALL}"]
+    for name in versions:
+        result = report["versions"][name]
+        lines.append(f"      {Fore.WHITE}{name:<8} {result['cipher']} ({result['bits']} bits)")
+    legacy = [name for name in versions if name in LEGACY_PROTOCOLS]
+    if legacy:
+        lines.append(f"      {Fore.RED}[!] Legacy protocol(s) accepted: {', '.join(legacy)}{Style.RESET_ALL}")
+    certificate = report["certificate"]
+    if certificate:
+        lines.append(f"      {Fore.WHITE}Subject  : {certificate['subject']}")
+        lines.append(f"      {Fore.WHITE}Issuer   : {certificate['issuer']}")
+        lines.append(f"      {Fore.WHITE}SAN      : {', '.join(certificate['san']) or '-'}")
+        color = Fore.RED if certificate["days_left"] < EXPIRY_WARNING_DAYS else Fore.WHITE
+        lines.append(f"      {color}Expires  : {certificate['not_after']} ({certificate['days_left']} days){Style.RESET_ALL}")
+        lines.append(f"      {Fore.WHITE}Chain    : {' <- '.join(report['chain'])}")
+    if report["trusted"] is False:
+        lines.append(f"      {Fore.RED}[!] Untrusted certificate: {report['trust_error']}{Style.RESET_ALL}")
+    return lines
+
+def _render_records(lines, label, records):
+    if records:
+        lines.append(f"  {Fore.WHITE}{label} Records:{Style.RESET_ALL}")
+        for record in records:
+            lines.append(f"    {Fore.CYAN}- {record}{Style.RESET_ALL}")
+    else:
+        lines.append(f"{Fore.YELLOW}{label} Records: Not Found{Style.RESET_ALL}")
+
+def render_domain(record):
+    lines = []
+    lines.append(f"{Fore.GREEN}[+] WHOIS Information:{Style.RESET_ALL}")
+    lines.extend(render_whois(record.whois))
+
+    lines.append(f"{Fore.GREEN}[+] DNS Information:{Style.RESET_ALL}")
+    for record_type, records in record.dns.items():
+        if records:
+            lines.append(f"  {Fore.WHITE}{record_type} Records:{Style.RESET_ALL}")
+            for entry in records:
+                lines.append(f"    {Fore.CYAN}- {entry}{Style.RESET_ALL}")
+        else:
+            lines.append(f"  {Fore.YELLOW}{record_type} Records: Not Found{Style.RESET_ALL}")
+
+    lines.append(f"{Fore.GREEN}[+] Common Subdomains:{Style.RESET_ALL}")
+    if record.subdomains:
+        for subdomain in record.subdomains:
+            lines.append(f"  {Fore.CYAN}- {subdomain}{Style.RESET_ALL}")
+    else:
+        lines.append(f"{Fore.YELLOW}[-] No common subdomains found.{Style.RESET_ALL}")
+
+    lines.append(f"{Fore.GREEN}[+] SSL/TLS Versions:{Style.RESET_ALL}")
+    if record.tls:
+        for report in record.tls:
+            lines.extend(render_tls(report))
+    elif record.ssl_tls_versions:
+        for version in record.ssl_tls_versions:
+            lines.append(f"  {Fore.CYAN}- {version}{Style.RESET_ALL}")
+    else:
+        lines.append(f"{Fore.YELLOW}[-] No SSL/TLS versions found or could not be checked.{Style.RESET_ALL}")
+
+    if record.private_ip_warning:
+        lines.append(f"{Fore.RED}[!] WARNING: Private IP address(es) found in DNS records!{Style.RESET_ALL}")
+
+    lines.append(f"{Fore.GREEN}[+] Email Authentication Records (SPF, DMARC, DKIM):{Style.RESET_ALL}")
+    for label in ('SPF', 'DMARC'):
+        _render_records(lines, label, record.dns.get(label))
+    if record.dkim:
+        lines.extend(render_dkim(record.dkim))
+    else: # Results cached before DKIM discovery
+        _render_records(lines, 'DKIM', record.dns.get('DKIM'))
+    return lines
+
+def describe_key(key):
+    """One-line summary of a discovered DKIM key, e.g. "google (Google Workspace): rsa 2048-bit"."""
+    name = f"{key['selector']} ({key['provider']})" if key["provider"] else key["selector"]
+    if key["revoked"]:
+        detail = "revoked"
+    elif key["error"]:
+        detail = f"{key['key_type']}, {key['error']}"
+    else:
+        detail = f"{key['key_type']} {key['bits']}-bit" if key["bits"] else key["key_type"]
+    if key["testing"]:
+        detail += ", testing"
+    return f"{name}: {detail}"
+
+def render_dkim(report):
+    lines = []
+    if report["keys"]:
+        provider = f" ({report['provider']})" if report["provider"] else ""
+        lines.append(f"  {Fore.WHITE}DKIM Keys{provider}:{Style.RESET_ALL}")
+        for key in report["keys"]:
+            weak = key["key_type"] == "rsa" and key["bits"] and key["bits"] < 1024
+            color = Fore.RED if key["revoked"] or key["error"] or weak else Fore.CYAN
+            lines.append(f"    {color}- {describe_key(key)}{Style.RESET_ALL}")
+    else:
+        lines.append(f"{Fore.YELLOW}DKIM Keys: Not Found ({report['checked']} selectors tried){Style.RESET_ALL}")
+    if report["wildcard"]:
+        lines.append(f"{Fore.YELLOW}[!] The zone answers every DKIM selector; the key above is a wildcard.{Style.RESET_ALL}")
+    if report["timed_out"]:
+        lines.append(f"{Fore.YELLOW}[!] DKIM discovery ran out of time; some selectors were not tried.{Style.RESET_ALL}")
+    return lines
+
+def render(module, target, records):
+    """Returns the colored terminal lines for one module's records about `target`."""
+    if module == "username":
+        return render_usernames(target, records)
+    if module == "email_recon":
+        return render_registrations(target, records)
+    if module == "email_breach":
+        return render_breach(records[0])
+    if module == "phone":
+        return render_phone(records[0])
+    if module == "domain":
+        return render_domain(records[0])
+    raise ValueError(f"Unknown module: {module}")
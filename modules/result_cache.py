@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import sys
+import time
+
+from modules.settings import get_settings
+
+DEFAULT_PATH = "saki_cache.sqlite3"
+
+# Seconds a stored result stays fresh, per module. Overridable in the [CACHE] section of config.ini
+DEFAULT_TTLS = {
+    "email_breach": 86400,
+    "email_recon": 3600,
+    "username": 3600,
+    "phone": 604800,
+    "domain": 86400,
+}
+
+# Statuses that mean a probe did not get an answer; results containing them are not stored
+TRANSIENT_STATUSES = ("Timeout", "Error", "RateLimited")
+
+def normalize_email(email):
+    return email.strip().lower()
+
+def normalize_target(module, target):
+    target = target.strip()
+    if module == "phone":
+        # Keyed by E.164 so notations of one number share an entry; unparseable input is kept as given
+        import phonenumbers
+        try:
+            return phonenumbers.format_number(phonenumbers.parse(target), phonenumbers.PhoneNumberFormat.E164)
+        except phonenumbers.NumberParseException:
+            return target
+    if module == "domain":
+        target = target.lower().rstrip(".")
+        for prefix in ("http://", "https://"):
+            if target.startswith(prefix):
+                target = target[len(prefix):]
+        return target.split("/")[0]
+    if module == "username":
+        # Some sites are case-sensitive, where "Alice" and "alice" are different accounts
+        return target
+    # Email addresses are matched case-insensitively by the sites we probe
+    return normalize_email(target)
+
+def is_cacheable(module, result):
+    if isinstance(result, dict):
+        if module == "domain":
+            whois = result.get("whois")
+            if (isinstance(whois, dict) and "error" in whois) or str(whois).startswith("Error getting WHOIS info"):
+                return False
+            # Stages analyze_domain_async saw fail, time out or get cut off
+            if result.get("incomplete"):
+                return False
+            dns = result.get("dns")
+            if isinstance(dns, dict) and "Error" in dns:
+                return False
+        if module == "phone":
+            mentions = result.get("online_mentions") or []
+            if any(str(mention).startswith("Error during Google search") for mention in mentions):
+                return False
+        return "error" not in result
+    if isinstance(result, list):
+        for entry in result:
+            if isinstance(entry, (list, tuple)) and len(entry) == 3:
+                status = entry[2]
+                if isinstance(status, str) and (status in TRANSIENT_STATUSES or status.startswith("Exception")):
+                    return False
+    return True
+
+class ResultCache:
+    """On-disk store of module results keyed by (module, normalized target) with per-module TTLs."""
+
+    def __init__(self, path=DEFAULT_PATH, ttls=None, refresh=False):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        # With refresh every lookup misses, but fresh results are still written back
+        self.refresh = refresh
+        self.follow_settings = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "module TEXT NOT NULL, target TEXT NOT NULL, created REAL NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (module, target))"
+        )
+        self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - max(self.ttls.values()),))
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls, refresh=False):
+        """The cache described by the [CACHE] section, or None when it is disabled there."""
+        settings = get_settings()
+        if not settings.cache_enabled:
+            return None
+        cache = cls(settings.cache_path, settings.cache_ttls, refresh)
+        cache.follow_settings = True
+        return cache
+
+    def ttl(self, module):
+        if self.follow_settings:
+            # TTLs edited in config.ini during a run apply to the next lookup
+            return get_settings().cache_ttls.get(module, DEFAULT_TTLS.get(module, 0))
+        return self.ttls.get(module, 0)
+
+    def _failed(self, action, e):
+        # A busy or broken cache costs a lookup or a stored result, never the result in hand
+        self.errors += 1
+        print(f"[!] Result cache {action} failed: {e}", file=sys.stderr)
+
+    def get(self, module, target):
+        """Returns (True, value) for a fresh stored result, otherwise (False, None)."""
+        if not self.refresh:
+            try:
+                row = self._db.execute(
+                    "SELECT created, value FROM results WHERE module = ? AND target = ?",
+                    (module, normalize_target(module, target)),
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._failed("read", e)
+                row = None
+            if row and time.time() - row[0] < self.ttl(module):
+                self.hits += 1
+                return True, json.loads(row[1])
+        self.misses += 1
+        return False, None
+
+    def put(self, module, target, value):
+        if not is_cacheable(module, value):
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (module, target, created, value) VALUES (?, ?, ?, ?)",
+                (module, normalize_target(module, target), time.time(), json.dumps(value, default=str)),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            self._db.rollback()
+            self._failed("write", e)
+
+    def close(self):
+        self._db.close()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
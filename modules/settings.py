@@ -0,0 +1,195 @@
+import configparser
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Optional
+
+CONFIG_PATH = "config.ini"
+# How often a running scan looks at config.ini's modification time
+RELOAD_CHECK_INTERVAL = 2.0
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed view of config.ini. Every field has a default, so a missing file or option is fine."""
+    hibp_api_key: Optional[str] = None
+    hibp_requests_per_minute: float = 10.0 # Lowest HIBP subscription; raise it for higher tiers
+    http_proxy: Optional[str] = None
+    https_proxy: Optional[str] = None
+
+    cache_enabled: bool = True
+    cache_path: str = "saki_cache.sqlite3"
+    cache_ttls: dict = field(default_factory=dict) # module -> seconds, only those set in the file
+    dns_cache_entries: int = 10000
+    whois_cache_entries: int = 10000
+
+    batch_concurrency: int = 50
+    connection_limit: int = 200
+    connection_limit_per_host: int = 8
+    host_rate: float = 5.0
+    domain_workers: int = 20
+    tls_concurrency: int = 100
+    mentions_per_minute: float = 20.0
+    dkim_qps: float = 200.0
+    browser_pool_size: int = 2
+
+    probe_timeout: float = 10.0
+    whois_timeout: float = 30.0
+    dns_timeout: float = 15.0
+    subdomain_timeout: float = 20.0
+    # Shared by every TLS handshake of one domain analysis, apex and subdomains together
+    tls_budget: float = 15.0
+    tls_handshake_timeout: float = 5.0
+    dkim_timeout: float = 20.0
+
+    @property
+    def proxies(self):
+        """The proxies as a requests-style {'http': ..., 'https': ...} dict."""
+        proxies = {}
+        if self.http_proxy: proxies['http'] = self.http_proxy
+        if self.https_proxy: proxies['https'] = self.https_proxy
+        return proxies
+
+    @property
+    def proxy(self):
+        # aiohttp uses a single proxy setting; prefer the HTTPS one since nearly all probes are https
+        return self.https_proxy or self.http_proxy
+
+# Settings field -> (section, option) in config.ini
+OPTIONS = {
+    "hibp_api_key": ("API_KEYS", "HIBP_API_KEY"),
+    "hibp_requests_per_minute": ("HIBP", "REQUESTS_PER_MINUTE"),
+    "http_proxy": ("PROXY", "HTTP_PROXY"),
+    "https_proxy": ("PROXY", "HTTPS_PROXY"),
+    "cache_enabled": ("CACHE", "ENABLED"),
+    "cache_path": ("CACHE", "PATH"),
+    "dns_cache_entries": ("CACHE", "DNS_ENTRIES"),
+    "whois_cache_entries": ("CACHE", "WHOIS_ENTRIES"),
+    "batch_concurrency": ("LIMITS", "BATCH_CONCURRENCY"),
+    "connection_limit": ("LIMITS", "CONNECTIONS"),
+    "connection_limit_per_host": ("LIMITS", "CONNECTIONS_PER_HOST"),
+    "host_rate": ("LIMITS", "HOST_RATE"),
+    "domain_workers": ("LIMITS", "DOMAIN_WORKERS"),
+    "tls_concurrency": ("LIMITS", "TLS_CONCURRENCY"),
+    "mentions_per_minute": ("LIMITS", "MENTIONS_PER_MINUTE"),
+    "dkim_qps": ("LIMITS", "DKIM_QPS"),
+    "browser_pool_size": ("LIMITS", "BROWSERS"),
+    "probe_timeout": ("TIMEOUTS", "PROBE"),
+    "whois_timeout": ("TIMEOUTS", "WHOIS"),
+    "dns_timeout": ("TIMEOUTS", "DNS"),
+    "subdomain_timeout": ("TIMEOUTS", "SUBDOMAINS"),
+    "tls_budget": ("TIMEOUTS", "TLS_BUDGET"),
+    "tls_handshake_timeout": ("TIMEOUTS", "TLS_HANDSHAKE"),
+    "dkim_timeout": ("TIMEOUTS", "DKIM"),
+}
+TTL_SUFFIX = "_TTL"
+
+class SettingsError(ValueError):
+    pass
+
+def _convert(value, kind):
+    if kind is bool:
+        if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+            raise ValueError(f"not a boolean: {value!r}")
+        return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+    return kind(value)
+
+def parse_settings(path=CONFIG_PATH):
+    """Reads `path` into a Settings; raises SettingsError naming the first bad option."""
+    config = configparser.ConfigParser()
+    try:
+        config.read(path)
+    except configparser.Error as e:
+        raise SettingsError(str(e)) from e
+
+    defaults = Settings()
+    values = {}
+    for item in fields(Settings):
+        if item.name not in OPTIONS:
+            continue
+        section, option = OPTIONS[item.name]
+        value = config.get(section, option, fallback="").strip()
+        if not value:
+            continue # Empty options, like an unset proxy, keep the default
+        default = getattr(defaults, item.name)
+        try:
+            values[item.name] = value if default is None else _convert(value, type(default))
+        except ValueError as e:
+            raise SettingsError(f"[{section}] {option}: {e}") from e
+        # Counts, rates, sizes and timeouts of 0 would stall a run or make a limiter divide by zero
+        if type(default) in (int, float) and not values[item.name] > 0:
+            raise SettingsError(f"[{section}] {option}: must be greater than 0, got {value!r}")
+
+    if config.has_section("CACHE"):
+        ttls = {}
+        for option, value in config["CACHE"].items():
+            if option.upper().endswith(TTL_SUFFIX) and value.strip():
+                try:
+                    ttls[option[:-len(TTL_SUFFIX)].lower()] = int(value)
+                except ValueError as e:
+                    raise SettingsError(f"[CACHE] {option.upper()}: {e}") from e
+        values["cache_ttls"] = ttls
+    return Settings(**values)
+
+class SettingsStore:
+    """
+    Holds the current Settings. config.ini is parsed once at startup, then re-parsed only when
+    its modification time changes, checked at most every `check_interval` seconds from get().
+    An edit that does not parse is reported and the previous settings stay in effect.
+    """
+
+    def __init__(self, path=CONFIG_PATH, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._settings = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _mtime_of(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self, path=None):
+        """(Re)reads the settings now, from `path` if given; raises SettingsError."""
+        with self._lock:
+            if path:
+                self.path = path
+            self._mtime = self._mtime_of()
+            self._settings = parse_settings(self.path)
+            self._checked = time.monotonic()
+            return self._settings
+
+    def get(self):
+        now = time.monotonic()
+        if self._settings is None:
+            return self.load()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            mtime = self._mtime_of()
+            if mtime != self._mtime:
+                self._reload(mtime)
+        return self._settings
+
+    def _reload(self, mtime):
+        with self._lock:
+            if mtime == self._mtime:
+                return # Another thread got here first
+            self._mtime = mtime
+            try:
+                self._settings = parse_settings(self.path)
+            except SettingsError as e:
+                print(f"[!] Ignoring changes to {self.path}: {e}", file=sys.stderr)
+                return
+            self.reloads += 1
+        print(f"[*] Reloaded settings from {self.path}.", file=sys.stderr)
+
+settings = SettingsStore()
+
+def get_settings():
+    """Returns the current settings snapshot; cheap enough to call per lookup."""
+    return settings.get()
@@ -0,0 +1,183 @@
+import asyncio
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.batch import run_batch
+from modules.journal import Journal
+from modules.output import ResultWriter
+from modules.result_cache import ResultCache
+from modules.settings import settings
+
+# A file-based work queue that several processes, or machines sharing a directory, can drain:
+#
+#   <job>/pending/<chunk>.txt   targets waiting for a worker
+#   <job>/claimed/<chunk>.txt   being processed (claimed with an atomic rename)
+#   <job>/results/<chunk>.jsonl finished chunk results; their presence is the checkpoint
+#   <job>/results/<chunk>.journal finished probes of a chunk still in progress
+#   <job>/done/<chunk>.txt      finished chunk inputs
+#   <job>/merged                chunks already copied into the merged output
+DEFAULT_CHUNK_SIZE = 500
+# Claims older than this are assumed to belong to a dead worker and are put back in the queue
+STALE_CLAIM_SECONDS = 3600
+POLL_INTERVAL = 1.0
+
+def _dirs(job_dir):
+    return {name: os.path.join(job_dir, name) for name in ("pending", "claimed", "results", "done")}
+
+def init_queue(job_dir, stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Splits the targets in `stream` into chunk files under job_dir/pending. Returns the number of chunks."""
+    dirs = _dirs(job_dir)
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    if any(os.listdir(path) for path in dirs.values()):
+        raise FileExistsError(f"{job_dir} already holds a job; resume it instead of initializing it again")
+
+    chunks = 0
+    buffer = []
+
+    def flush():
+        nonlocal chunks, buffer
+        path = os.path.join(dirs["pending"], f"chunk-{chunks:06d}.txt")
+        with open(path + ".tmp", "w") as f:
+            f.writelines(buffer)
+        os.replace(path + ".tmp", path)
+        chunks += 1
+        buffer = []
+
+    for line in stream:
+        if line.strip() and not line.lstrip().startswith("#"):
+            buffer.append(line if line.endswith("\n") else line + "\n")
+            if len(buffer) >= chunk_size:
+                flush()
+    if buffer:
+        flush()
+    return chunks
+
+def requeue_stale(job_dir, max_age=STALE_CLAIM_SECONDS):
+    dirs = _dirs(job_dir)
+    requeued = 0
+    for path in glob.glob(os.path.join(dirs["claimed"], "*.txt")):
+        if time.time() - os.path.getmtime(path) > max_age:
+            try:
+                os.rename(path, os.path.join(dirs["pending"], os.path.basename(path)))
+                requeued += 1
+            except FileNotFoundError:
+                pass # Another worker got there first
+    return requeued
+
+def claim_chunk(job_dir):
+    """Atomically moves one pending chunk to claimed and returns its name, or None when the queue is empty."""
+    dirs = _dirs(job_dir)
+    for path in sorted(glob.glob(os.path.join(dirs["pending"], "*.txt"))):
+        claimed = os.path.join(dirs["claimed"], os.path.basename(path))
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue # Claimed by another worker between listing and renaming
+        os.utime(claimed)
+        return os.path.basename(path)
+    return None
+
+def work(job_dir, concurrency=None, modules=None, use_cache=True, refresh=False):
+    """Claims and processes chunks until the queue is empty. Safe to run on several hosts at once."""
+    dirs = _dirs(job_dir)
+    cache = ResultCache.from_config(refresh=refresh) if use_cache else None
+    processed = 0
+    try:
+        while True:
+            name = claim_chunk(job_dir)
+            if name is None:
+                return processed
+            chunk = name[:-len(".txt")]
+            # A chunk taken over from a dead worker continues its partial output through the journal
+            partial = os.path.join(dirs["results"], f"{chunk}.partial")
+            journal = Journal(os.path.join(dirs["results"], f"{chunk}.journal"))
+            with open(os.path.join(dirs["claimed"], name)) as stream:
+                # Large flush batches: nobody reads a chunk until it is complete
+                writer = ResultWriter(partial, "jsonl", flush_every=256)
+                try:
+                    asyncio.run(run_batch(stream, writer, concurrency, modules, cache, journal))
+                finally:
+                    writer.close()
+                    journal.close()
+            # Publishing the result file is the checkpoint; the chunk is never redone after this
+            os.replace(partial, os.path.join(dirs["results"], f"{chunk}.jsonl"))
+            os.replace(os.path.join(dirs["claimed"], name), os.path.join(dirs["done"], name))
+            os.remove(journal.path)
+            processed += 1
+    finally:
+        if cache:
+            cache.close()
+
+def status(job_dir):
+    dirs = _dirs(job_dir)
+    counts = {name: len(glob.glob(os.path.join(path, "*.txt"))) for name, path in dirs.items() if name != "results"}
+    counts["merged"] = len(_merged(job_dir))
+    return counts
+
+def _merged(job_dir):
+    try:
+        with open(os.path.join(job_dir, "merged")) as f:
+            return set(f.read().split())
+    except FileNotFoundError:
+        return set()
+
+def merge(job_dir, writer):
+    """Copies every finished, not yet merged chunk into `writer`. Returns the number of chunks merged."""
+    merged = _merged(job_dir)
+    count = 0
+    with open(os.path.join(job_dir, "merged"), "a") as log:
+        for path in sorted(glob.glob(os.path.join(_dirs(job_dir)["results"], "*.jsonl"))):
+            chunk = os.path.basename(path)
+            if chunk in merged:
+                continue
+            with open(path) as f:
+                for line in f:
+                    writer.write_dict(json.loads(line))
+            log.write(chunk + "\n")
+            log.flush()
+            count += 1
+    return count
+
+def _work_process(job_dir, concurrency, modules, use_cache, refresh, config_path):
+    # Each process runs its own event loop and connection pool, and watches the same config.ini
+    settings.load(config_path)
+    return work(job_dir, concurrency, modules, use_cache, refresh)
+
+def run_sharded(stream, writer, workers=os.cpu_count(), concurrency=None, modules=None, use_cache=True,
+                refresh=False, job_dir=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Splits the targets across `workers` processes through a work queue in `job_dir` and merges
+    their results into `writer` as chunks finish. Re-running with the same job_dir resumes:
+    finished chunks are neither processed nor written again.
+    """
+    temporary = job_dir is None
+    if temporary:
+        job_dir = tempfile.mkdtemp(prefix="saki-job-")
+    if not os.path.isdir(os.path.join(job_dir, "pending")):
+        init_queue(job_dir, stream, chunk_size)
+    else:
+        requeue_stale(job_dir, max_age=0) # Resuming: anything still claimed died with the previous run
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_work_process, job_dir, concurrency, modules, use_cache, refresh, settings.path)
+                   for _ in range(workers)]
+        while not all(future.done() for future in futures):
+            merge(job_dir, writer)
+            time.sleep(POLL_INTERVAL)
+        for future in futures:
+            future.result() # Surface worker crashes
+    merge(job_dir, writer)
+
+    counts = status(job_dir)
+    if temporary:
+        shutil.rmtree(job_dir, ignore_errors=True)
+    else:
+        print(f"[*] Job {job_dir}: {counts['done']} chunks done, {counts['pending'] + counts['claimed']} remaining.", file=sys.stderr)
+    return counts
@@ -0,0 +1,189 @@
+import json
+import os
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Pattern, Tuple
+
+from modules.http_client import USER_AGENT, MAX_BODY_BYTES
+
+USERNAME_SITES_PATH = "sites_data.json"
+EMAIL_SITES_PATH = "email_recon_sites.json"
+
+CHECK_TYPES = ("status_code", "message", "response_url")
+METHODS = ("GET", "POST")
+# HEAD is only useful when the verdict depends on the status code alone
+USERNAME_METHODS = ("GET", "HEAD")
+
+# path -> (mtime, parsed sites); reparsed only when the file changes
+_cache = {}
+
+class SiteDefinitionError(ValueError):
+    """Raised when a site definition file is malformed."""
+
+@dataclass(frozen=True)
+class UsernameSite:
+    name: str
+    url: str
+    headers: Mapping[str, str]
+    check_type: str = "status_code"
+    # Body pattern that marks a missing profile (check_type "message")
+    error_pattern: Optional[Pattern] = None
+    # URL a missing profile redirects to (check_type "response_url")
+    error_url: Optional[str] = None
+    method: str = "GET"
+    max_bytes: int = MAX_BODY_BYTES
+    # Most sites treat "John" and "john" as the same profile; those that don't set this
+    case_sensitive: bool = False
+
+    def url_for(self, username):
+        return self.url.format(username)
+
+@dataclass(frozen=True)
+class EmailSite:
+    name: str
+    url: str
+    method: str
+    headers: Mapping[str, str]
+    data: Optional[str] = None
+    json_body: bool = False
+    params: Tuple[Tuple[str, str], ...] = ()
+    success_pattern: Optional[Pattern] = None
+    fail_pattern: Optional[Pattern] = None
+    max_bytes: int = MAX_BODY_BYTES
+
+    def url_for(self, email):
+        return self.url.format(email=email)
+
+    def request_kwargs(self, email):
+        """Builds fresh request arguments for one email; the site itself is never modified."""
+        kwargs = {"headers": self.headers}
+        if self.method == "POST":
+            if self.data:
+                body = self.data.format(email=email)
+                if self.json_body:
+                    kwargs["json"] = json.loads(body)
+                else:
+                    kwargs["data"] = body
+        else:
+            kwargs["params"] = {key: value.format(email=email) for key, value in self.params}
+        return kwargs
+
+def _compile(pattern, where):
+    if pattern is None:
+        return None
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise SiteDefinitionError(f"{where}: invalid regex {pattern!r}: {e}") from None
+
+def _require(site, key, where):
+    value = site.get(key)
+    if not isinstance(value, str) or not value:
+        raise SiteDefinitionError(f"{where}: missing or empty '{key}'")
+    return value
+
+def _max_bytes(site, where):
+    max_bytes = site.get("max_bytes", MAX_BODY_BYTES)
+    if not isinstance(max_bytes, int) or isinstance(max_bytes, bool) or max_bytes <= 0:
+        raise SiteDefinitionError(f"{where}: 'max_bytes' must be a positive integer")
+    return max_bytes
+
+def _headers(site, where):
+    headers = site.get("headers", {})
+    if not isinstance(headers, dict):
+        raise SiteDefinitionError(f"{where}: 'headers' must be an object")
+    merged = {"User-Agent": USER_AGENT}
+    merged.update(headers)
+    return MappingProxyType(merged)
+
+def _parse_username_site(site, where):
+    name = _require(site, "name", where)
+    url = _require(site, "url", where)
+    if "{}" not in url:
+        raise SiteDefinitionError(f"{where}: 'url' must contain a '{{}}' placeholder for the username")
+
+    check_type = site.get("check_type", "status_code")
+    if check_type not in CHECK_TYPES:
+        raise SiteDefinitionError(f"{where}: unknown check_type {check_type!r} (expected one of {', '.join(CHECK_TYPES)})")
+
+    error_pattern = None
+    error_url = None
+    if check_type == "message":
+        error_msg = site.get("error_msg")
+        if isinstance(error_msg, str):
+            error_msg = [error_msg]
+        if not error_msg:
+            raise SiteDefinitionError(f"{where}: check_type 'message' needs 'error_msg'")
+        error_pattern = re.compile("|".join(re.escape(msg) for msg in error_msg))
+    elif check_type == "response_url":
+        error_url = _require(site, "error_url", where)
+
+    method = site.get("method", "GET").upper()
+    if method not in USERNAME_METHODS:
+        raise SiteDefinitionError(f"{where}: unsupported method {method!r}")
+    if method == "HEAD" and check_type == "message":
+        raise SiteDefinitionError(f"{where}: check_type 'message' needs the body, it cannot use HEAD")
+
+    case_sensitive = site.get("case_sensitive", False)
+    if not isinstance(case_sensitive, bool):
+        raise SiteDefinitionError(f"{where}: 'case_sensitive' must be true or false")
+
+    return UsernameSite(name, url, _headers(site, where), check_type, error_pattern, error_url,
+                        method, _max_bytes(site, where), case_sensitive)
+
+def _parse_email_site(site, where):
+    name = _require(site, "name", where)
+    url = _require(site, "url", where)
+    method = site.get("method", "GET").upper()
+    if method not in METHODS:
+        raise SiteDefinitionError(f"{where}: unsupported method {method!r}")
+
+    headers = _headers(site, where)
+    params = site.get("params", {})
+    if not isinstance(params, dict):
+        raise SiteDefinitionError(f"{where}: 'params' must be an object")
+
+    return EmailSite(
+        name=name,
+        url=url,
+        method=method,
+        headers=headers,
+        data=site.get("data"),
+        json_body="application/json" in headers.get("Content-Type", ""),
+        params=tuple(params.items()),
+        success_pattern=_compile(site.get("success_regex"), where),
+        fail_pattern=_compile(site.get("fail_regex"), where),
+        max_bytes=_max_bytes(site, where),
+    )
+
+def _load(path, parse_site):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except json.JSONDecodeError as e:
+        raise SiteDefinitionError(f"{path}: invalid JSON: {e}") from None
+    if not isinstance(raw, dict) or not isinstance(raw.get("sites"), list):
+        raise SiteDefinitionError(f"{path}: expected an object with a 'sites' list")
+
+    sites = []
+    for index, site in enumerate(raw["sites"]):
+        where = f"{path}: site #{index}"
+        if not isinstance(site, dict):
+            raise SiteDefinitionError(f"{where}: expected an object")
+        sites.append(parse_site(site, where))
+
+    sites = tuple(sites)
+    _cache[path] = (mtime, sites)
+    return sites
+
+def load_username_sites(path=USERNAME_SITES_PATH):
+    return _load(path, _parse_username_site)
+
+def load_email_sites(path=EMAIL_SITES_PATH):
+    return _load(path, _parse_email_site)
@@ -0,0 +1,106 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from modules.registry import LOOKUPS
+
+# Startup and import-cost report. Every measurement runs in a fresh interpreter under
+# -X importtime, since within one process a module is only ever imported once.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPEAT = 5
+TOP_IMPORTS = 5
+# Slower than the baseline by this factor and by more than REGRESSION_FLOOR seconds counts as a regression
+REGRESSION_RATIO = 1.25
+REGRESSION_FLOOR = 0.005
+# "import time: <self us> | <cumulative us> | <indent by depth><module>"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+def _run(args):
+    """
+    Runs the interpreter with `args` under -X importtime. Returns the wall time and the imports
+    as (module, depth, cumulative seconds), each listed after the imports it triggered.
+    """
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    imports = []
+    error = f"exit status {result.returncode}"
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports.append((match[4], (len(match[3]) - 1) // 2, int(match[2]) / 1e6))
+        elif result.returncode and line.strip():
+            error = line.strip()
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(args)} failed: {error}")
+    return wall, imports
+
+def _children(imports, module):
+    """The imports `module` triggered directly."""
+    children = []
+    for name, depth, seconds in imports:
+        if depth == 0:
+            if name == module:
+                return children
+            children = []
+        elif depth == 1:
+            children.append((name, seconds))
+    return []
+
+def _heaviest(imports):
+    return [{"module": name, "seconds": round(seconds, 4)}
+            for name, seconds in sorted(imports, key=lambda item: item[1], reverse=True)[:TOP_IMPORTS]]
+
+def measure_startup(modules=None, repeat=DEFAULT_REPEAT):
+    """
+    Measures, as the median of `repeat` cold runs, how long `main.py --help` takes beyond a bare
+    interpreter and how long each module in `modules` (default: the lookup modules) takes to import.
+    """
+    baseline = [_run(["-c", "pass"]) for _ in range(repeat)]
+    interpreter = statistics.median(wall for wall, _ in baseline)
+    # Whatever the bare interpreter imports (site, encodings...) is not ours to account for
+    preloaded = {name for name, _, _ in baseline[0][1]}
+
+    runs = [_run(["main.py", "--help"]) for _ in range(repeat)]
+    top_level = [(name, seconds) for name, depth, seconds in runs[-1][1] if depth == 0 and name not in preloaded]
+    results = [{
+        "name": "main.py --help",
+        "seconds": round(max(0.0, statistics.median(wall for wall, _ in runs) - interpreter), 4),
+        "heaviest": _heaviest(top_level),
+    }]
+
+    for module in modules or LOOKUPS.values():
+        runs = [_run(["-c", f"import {module}"]) for _ in range(repeat)]
+        costs = [next((seconds for name, depth, seconds in imports if name == module and depth == 0), 0.0)
+                 for _, imports in runs]
+        results.append({
+            "name": module,
+            "seconds": round(statistics.median(costs), 4),
+            "heaviest": _heaviest(_children(runs[-1][1], module)),
+        })
+    return {"python": sys.version.split()[0], "interpreter": round(interpreter, 4), "repeat": repeat, "results": results}
+
+def find_regressions(report, baseline):
+    """Lines describing every measurement that got notably slower than in `baseline` (an earlier report)."""
+    before = {result["name"]: result["seconds"] for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        if result["seconds"] > old * REGRESSION_RATIO and result["seconds"] - old > REGRESSION_FLOOR:
+            regressions.append(f"[!] {result['name']}: {old:.3f}s -> {result['seconds']:.3f}s "
+                               f"(+{(result['seconds'] / old - 1) * 100 if old else 100:.0f}%)")
+    return regressions
+
+def print_report(report):
+    print(f"[*] Python {report['python']}: bare interpreter starts in {report['interpreter']:.3f}s "
+          f"(median of {report['repeat']} runs).")
+    for result in report["results"]:
+        what = "beyond the interpreter" if result["name"].startswith("main.py") else "to import"
+        heaviest = ", ".join(f"{item['module']} {item['seconds']:.3f}s" for item in result["heaviest"])
+        print(f"[*] {result['name']}: {result['seconds']:.3f}s {what}" + (f"; heaviest: {heaviest}" if heaviest else ""))
@@ -0,0 +1,136 @@
+import asyncio
+import random
+import string
+import sys
+import time
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+from modules.dns_cache import dns_cache
+from modules.ratelimit import TokenBucket
+
+DEFAULT_QPS = 200
+DEFAULT_CONCURRENCY = 100
+DNS_TIMEOUT = 5
+WILDCARD_PROBES = 3
+
+DNS_LOOKUP_ERRORS = (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.NoNameservers)
+
+# Wildcard answers per zone, detected once and reused for the rest of the process
+_wildcard_cache = {}
+
+def iter_wordlist(path):
+    """Streams subdomain labels from a wordlist file without loading it into memory."""
+    seen = set()
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            word = line.strip().lower().rstrip(".")
+            if not word or word.startswith("#") or word in seen:
+                continue
+            seen.add(word)
+            yield word
+
+class ResolverPool:
+    """Round-robins queries over one async resolver per nameserver (or the system resolver)."""
+
+    def __init__(self, nameservers=None, timeout=DNS_TIMEOUT):
+        if nameservers:
+            self.resolvers = []
+            for nameserver in nameservers:
+                resolver = dns.asyncresolver.Resolver(configure=False)
+                resolver.nameservers = [nameserver]
+                self.resolvers.append(resolver)
+        else:
+            # The process-wide system resolver, shared with the rest of the DNS lookups
+            self.resolvers = [dns.asyncresolver.get_default_resolver()]
+        self.timeout = timeout
+        self._next = 0
+
+    async def resolve(self, name, rtype="A"):
+        resolver = self.resolvers[self._next % len(self.resolvers)]
+        self._next += 1
+        return sorted(await dns_cache.resolve(name, rtype, resolver, self.timeout))
+
+async def detect_wildcard(domain, pool):
+    """Returns the set of addresses a zone answers for random labels (empty if it has no wildcard)."""
+    if domain in _wildcard_cache:
+        return _wildcard_cache[domain]
+    addresses = set()
+    for _ in range(WILDCARD_PROBES):
+        label = "".join(random.choices(string.ascii_lowercase + string.digits, k=16))
+        try:
+            addresses.update(await pool.resolve(f"{label}.{domain}"))
+        except (dns.exception.DNSException, OSError):
+            pass
+    _wildcard_cache[domain] = frozenset(addresses)
+    return _wildcard_cache[domain]
+
+def print_progress(stats):
+    print(f"[*] {stats['checked']} checked, {stats['found']} found, {stats['errors']} errors, "
+          f"{stats['rate']:.1f} q/s", file=sys.stderr)
+
+async def enumerate_subdomains(domain, words, qps=DEFAULT_QPS, concurrency=DEFAULT_CONCURRENCY,
+                               nameservers=None, on_found=None, progress=None, progress_interval=2.0):
+    """
+    Brute-forces subdomains of `domain` from `words` (a wordlist path or an iterable of labels).
+    Returns a list of (subdomain, addresses). Hits that only return the zone's wildcard
+    addresses are dropped. `on_found` is called for every hit as it is found and `progress`
+    every `progress_interval` seconds with a stats dict.
+    """
+    if isinstance(words, str):
+        words = iter_wordlist(words)
+
+    pool = ResolverPool(nameservers)
+    limiter = TokenBucket(qps)
+    wildcard = await detect_wildcard(domain, pool)
+
+    found = []
+    stats = {"checked": 0, "found": 0, "errors": 0, "wildcard": bool(wildcard), "rate": 0.0}
+    started = time.monotonic()
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+
+    async def worker():
+        while True:
+            word = await queue.get()
+            if word is None:
+                return
+            subdomain = f"{word}.{domain}"
+            await limiter.acquire()
+            try:
+                addresses = await pool.resolve(subdomain)
+                if not wildcard or not set(addresses) <= wildcard:
+                    found.append((subdomain, addresses))
+                    stats["found"] += 1
+                    if on_found:
+                        on_found(subdomain, addresses)
+            except DNS_LOOKUP_ERRORS:
+                pass # Subdomain does not exist
+            except (dns.exception.DNSException, OSError):
+                stats["errors"] += 1
+            stats["checked"] += 1
+
+    async def report():
+        while True:
+            await asyncio.sleep(progress_interval)
+            stats["rate"] = stats["checked"] / max(time.monotonic() - started, 1e-6)
+            progress(stats)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    reporter = asyncio.create_task(report()) if progress else None
+    try:
+        for word in words:
+            await queue.put(word)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        if reporter:
+            reporter.cancel()
+
+    stats["rate"] = stats["checked"] / max(time.monotonic() - started, 1e-6)
+    if progress:
+        progress(stats)
+    return found
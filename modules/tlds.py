@@ -0,0 +1,41 @@
+# Top-level domains used to tell an untagged domain from a dotted username ("john.smith").
+# Kept offline so target detection needs neither the network nor the lookup modules.
+# Country codes are every delegated ccTLD; the generic ones are the legacy gTLDs plus the
+# new gTLDs that actually carry sites. A domain under a TLD missing here can still be
+# looked up by tagging it ("domain:example.whatever").
+
+COUNTRY_CODE_TLDS = frozenset("""
+ac ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bm bn bo br bs
+bt bv bw by bz ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm do dz ec
+ee eg er es et eu fi fj fk fm fo fr ga gb gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy
+hk hm hn hr ht hu id ie il im in io iq ir is it je jm jo jp ke kg kh ki km kn kp kr kw ky kz
+la lb lc li lk lr ls lt lu lv ly ma mc md me mg mh mk ml mm mn mo mp mq mr ms mt mu mv mw mx
+my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl pm pn pr ps pt pw py qa re
+ro rs ru rw sa sb sc sd se sg sh si sj sk sl sm sn so sr ss st su sv sx sy sz tc td tf tg th
+tj tk tl tm tn to tr tt tv tw tz ua ug uk us uy uz va vc ve vg vi vn vu wf ws ye yt za zm zw
+""".split())
+
+GENERIC_TLDS = frozenset("""
+aero arpa asia biz cat com coop edu gov info int jobs mil mobi museum name net org post pro
+tel travel xxx
+academy agency app art audio auto bar beer best bid bike bio black blog blue boutique build
+business buzz cafe cam camera capital care careers cash center chat church city click clinic
+cloud club codes coffee college community company computer consulting cool credit dance date
+deals design dev diet digital direct directory dog domains download earth education email energy
+engineering enterprises equipment estate events exchange expert express family fan farm fashion
+finance financial fit fitness flowers foundation fun fund futbol fyi gallery game games garden
+gift gifts global gold golf graphics green group guide guru health help holdings home host
+house icu inc industries institute insure international investments kitchen land law lawyer
+life lighting limited link live llc loan lol love ltd management market marketing media menu
+money movie music network news ninja one online page partners party photo photography photos
+pics pink pizza place plus press productions properties pub red rent repair report rest
+restaurant review reviews rocks run sale school science services shop shopping show site social
+software solar solutions space store stream studio style support surf systems tax team tech
+technology tips today tools top tours town toys trade training tube university uno vacations
+vegas ventures video vip vision wang watch webcam website wiki win wine work works world wtf
+xyz yoga zone
+""".split())
+
+def is_known_tld(tld):
+    tld = tld.lower()
+    return tld in COUNTRY_CODE_TLDS or tld in GENERIC_TLDS or tld.startswith("xn--")
@@ -0,0 +1,197 @@
+import asyncio
+import socket
+import ssl
+import time
+from datetime import datetime, timezone
+
+from modules.dns_cache import dns_cache
+from modules.metrics import metrics
+from modules.settings import get_settings
+
+# Protocols probed one at a time by pinning both ends of the allowed range to the same version
+PROTOCOLS = (
+    ("TLSv1", ssl.TLSVersion.TLSv1),
+    ("TLSv1.1", ssl.TLSVersion.TLSv1_1),
+    ("TLSv1.2", ssl.TLSVersion.TLSv1_2),
+    ("TLSv1.3", ssl.TLSVersion.TLSv1_3),
+)
+BUDGET_EXHAUSTED = "Handshake budget exhausted"
+
+def _probe_context(version):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    # Version probes must complete against any certificate; trust is checked separately
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.minimum_version = version
+    context.maximum_version = version
+    if version < ssl.TLSVersion.TLSv1_2:
+        # OpenSSL refuses legacy protocols at its default security level
+        context.set_ciphers("ALL:@SECLEVEL=0")
+    return context
+
+def _name(fields):
+    return ", ".join(f"{key}={value}" for rdn in fields for key, value in rdn)
+
+def _timestamp(value):
+    return datetime.fromtimestamp(ssl.cert_time_to_seconds(value), timezone.utc)
+
+def _certificate(info):
+    not_after = _timestamp(info["notAfter"])
+    return {
+        "subject": _name(info.get("subject", ())),
+        "issuer": _name(info.get("issuer", ())),
+        "san": [value for kind, value in info.get("subjectAltName", ()) if kind in ("DNS", "IP Address")],
+        "not_before": _timestamp(info["notBefore"]).isoformat(),
+        "not_after": not_after.isoformat(),
+        "days_left": (not_after - datetime.now(timezone.utc)).days,
+        "serial": info.get("serialNumber"),
+    }
+
+def _peer_chain(ssl_object):
+    # Public from Python 3.13; older versions only expose it on the underlying _ssl object
+    get_chain = getattr(ssl_object, "get_unverified_chain", None) or getattr(ssl_object._sslobj, "get_unverified_chain", None)
+    return [cert.get_info() for cert in (get_chain() or [])] if get_chain else []
+
+class HandshakeBudget:
+    """A deadline shared by every handshake of a scan; each handshake gets at most `per_handshake` seconds of it."""
+
+    def __init__(self, total=None, per_handshake=None):
+        self.per_handshake = per_handshake or get_settings().tls_handshake_timeout
+        self.deadline = time.monotonic() + total if total else None
+
+    def next_timeout(self):
+        if self.deadline is None:
+            return self.per_handshake
+        return min(self.per_handshake, self.deadline - time.monotonic())
+
+async def _handshake(address, host, port, context, semaphore, budget, label):
+    """Returns the negotiated ssl object's details, or raises what the handshake raised."""
+    async with semaphore:
+        timeout = budget.next_timeout()
+        if timeout <= 0:
+            raise TimeoutError(BUDGET_EXHAUSTED)
+        with metrics.timed("tls", "tls_handshake", label):
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, port, ssl=context, server_hostname=host), timeout)
+    try:
+        ssl_object = writer.get_extra_info("ssl_object")
+        cipher, _, bits = ssl_object.cipher()
+        return {"version": ssl_object.version(), "cipher": cipher, "bits": bits, "chain": _peer_chain(ssl_object)}
+    finally:
+        writer.close()
+
+async def _resolve_address(host):
+    # Resolved once per host through the shared DNS cache, not once per handshake
+    for rtype in ("A", "AAAA"):
+        try:
+            return (await dns_cache.resolve(host, rtype))[0]
+        except Exception:
+            continue
+    # IP literals and names only the system knows (e.g. /etc/hosts)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        return infos[0][4][0]
+    except OSError:
+        return None
+
+async def scan_host(host, port=443, semaphore=None, budget=None):
+    """
+    Probes which TLS versions `host` accepts, one handshake per version, and collects the
+    negotiated cipher, the certificate chain and whether the chain is trusted for the name.
+    """
+    semaphore = semaphore or asyncio.Semaphore(get_settings().tls_concurrency)
+    budget = budget or HandshakeBudget()
+    report = {"host": host, "address": None, "port": port, "versions": {}, "certificate": None,
+              "chain": [], "trusted": None, "trust_error": None, "error": None}
+
+    address = await _resolve_address(host)
+    if address is None:
+        report["error"] = "Could not resolve host"
+        return report
+    report["address"] = address
+
+    async def probe(name, version):
+        try:
+            context = _probe_context(version)
+            return name, await _handshake(address, host, port, context, semaphore, budget, name)
+        except ssl.SSLError as e:
+            if "NO_PROTOCOLS_AVAILABLE" in str(e) or "no protocols available" in str(e):
+                return name, RuntimeError("Not supported by the local OpenSSL")
+            return name, e # The server refused this version
+        except ValueError:
+            return name, RuntimeError("Not supported by the local OpenSSL")
+        except (OSError, asyncio.TimeoutError) as e:
+            return name, e
+
+    outcomes = await asyncio.gather(*(probe(name, version) for name, version in PROTOCOLS))
+    reachable = any(isinstance(outcome, dict) for _, outcome in outcomes)
+    best = None
+    for name, outcome in outcomes:
+        if isinstance(outcome, dict):
+            report["versions"][name] = {"supported": True, "cipher": outcome["cipher"], "bits": outcome["bits"]}
+            best = outcome
+        elif isinstance(outcome, ssl.SSLError) or (reachable and isinstance(outcome, ConnectionResetError)):
+            # Some servers drop the connection instead of sending a protocol_version alert
+            report["versions"][name] = {"supported": False}
+        else:
+            # Timeouts and connection errors say nothing about the version itself
+            report["versions"][name] = {"supported": None, "error": str(outcome) or type(outcome).__name__}
+
+    if best is None:
+        errors = [v["error"] for v in report["versions"].values() if v.get("error")]
+        report["error"] = errors[-1] if errors else "No TLS version accepted"
+        return report
+
+    # `best` is the newest accepted version, PROTOCOLS being in ascending order
+    if best["chain"]:
+        report["certificate"] = _certificate(best["chain"][0])
+        report["chain"] = [_name(cert.get("subject", ())) for cert in best["chain"]]
+    try:
+        await _handshake(address, host, port, ssl.create_default_context(), semaphore, budget, "verify")
+        report["trusted"] = True
+    except ssl.SSLCertVerificationError as e:
+        report["trusted"] = False
+        report["trust_error"] = e.verify_message or str(e)
+    except (OSError, asyncio.TimeoutError, ssl.SSLError) as e:
+        report["trust_error"] = str(e) or type(e).__name__
+    return report
+
+def supported_versions(report):
+    return [name for name, result in report["versions"].items() if result.get("supported")]
+
+def is_complete(report):
+    """False when part of the scan was cut off by the shared budget, so it is worth repeating."""
+    return not any(result.get("error") == BUDGET_EXHAUSTED for result in report["versions"].values())
+
+async def scan_hosts(hosts, port=443, concurrency=None, budget=None, handshake_timeout=None, on_result=None):
+    """
+    Scans many hosts at once. At most `concurrency` handshakes are in flight across all hosts,
+    and `budget` (seconds, optional) bounds the whole scan; handshakes that would start after
+    it are skipped. Returns the reports in the order of `hosts` (duplicates scanned once);
+    `on_result` is called with each host's report as it finishes.
+    """
+    concurrency = concurrency or get_settings().tls_concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    shared_budget = HandshakeBudget(budget, handshake_timeout)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    unique = list(dict.fromkeys(hosts))
+    reports = [None] * len(unique)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, host = item
+            report = reports[index] = await scan_host(host, port, semaphore, shared_budget)
+            if on_result:
+                on_result(report)
+
+    # Several probes per host share the semaphore, so fewer host workers keep it saturated
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency // 2))]
+    for item in enumerate(unique):
+        await queue.put(item)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return reports
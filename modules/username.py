@@ -1,39 +1,127 @@
 import asyncio
+import time
+from urllib.parse import urlsplit, urlunsplit
 import aiohttp
-import json
-import configparser
 
-async def check_username(session, site, username):
-    url = site["url"].format(username)
+from modules.http_client import get_session, scan_body, discard_body
+from modules.journal import journaled
+from modules.metrics import metrics, probe_context
+from modules.ratelimit import get_scheduler, RateLimitedError
+from modules.settings import get_settings
+from modules.sites import load_username_sites
+
+async def check_username(session, site, username, scheduler=None):
+    started = time.perf_counter()
+    result = await _check_username(session, site, username, scheduler)
+    metrics.probe("username", site.name, time.perf_counter() - started, result[2])
+    return result
+
+async def _check_username(session, site, username, scheduler=None):
+    url = site.url_for(username)
+    scheduler = scheduler or get_scheduler()
+
+    async def handle(response):
+        if site.check_type == "message" and response.status == 200:
+            # Stop reading as soon as the "missing profile" message shows up
+            matched = await scan_body(response, {"error": site.error_pattern}, bool, site.max_bytes)
+            return site.name, url, not matched
+        # The verdict only depends on the status line, so the body is never downloaded
+        await discard_body(response)
+        if response.status != 200:
+            return site.name, url, False
+        if site.check_type == "response_url":
+            # Missing profiles redirect to the site's error page
+            return site.name, url, str(response.url) != site.error_url.format(username)
+        return site.name, url, True
+
     try:
-        async with session.get(url, timeout=10) as response:
-            if response.status == 200:
-                return site["name"], url, True
-            else:
-                return site["name"], url, False
+        # Paced per host and retried on throttling/transient failures instead of reporting "not found"
+        return await scheduler.request(session, site.method, url, handle, headers=site.headers,
+                                       timeout=get_settings().probe_timeout,
+                                       trace_request_ctx=probe_context("username", site.name))
+    except RateLimitedError:
+        return site.name, url, "RateLimited"
     except asyncio.TimeoutError:
-        return site["name"], url, "Timeout"
+        return site.name, url, "Timeout"
     except aiohttp.ClientError:
-        return site["name"], url, "Error"
-
-async def search_usernames(username):
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-
-    proxy = None
-    if config.has_section('PROXY'):
-        http_proxy = config['PROXY'].get('HTTP_PROXY')
-        if http_proxy: # aiohttp uses a single proxy setting
-            proxy = http_proxy
+        return site.name, url, "Error"
 
-    with open("sites_data.json") as f:
-        sites = json.load(f)["sites"]
+async def search_usernames(username, session=None, journal=None, sites=None):
+    # Pooled session; proxy, keep-alive and per-host limits are configured in http_client
+    session = session or get_session()
+    sites = sites or load_username_sites()
 
     results = []
-    async with aiohttp.ClientSession() as session:
-        tasks = [check_username(session, site, username) for site in sites]
-        responses = await asyncio.gather(*tasks)
-        for result in responses:
-            if result:
-                results.append(result)
+    # With a journal, sites answered by an interrupted earlier run are not probed again
+    tasks = [journaled(journal, "username", username, site.name, lambda site=site: check_username(session, site, username))
+             for site in sites]
+    responses = await asyncio.gather(*tasks)
+    for result in responses:
+        if result:
+            results.append(result)
     return results
+
+def normalize_profile_url(url, case_sensitive=False):
+    """
+    Key under which two profile URLs name the same page. Scheme and host are always compared
+    case-insensitively, the path and query too unless the site is case-sensitive.
+    """
+    parts = urlsplit(url)
+    path, query = parts.path.rstrip("/"), parts.query
+    if not case_sensitive:
+        path, query = path.lower(), query.lower()
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+def plan_variant_probes(variants, sites):
+    """
+    Returns (plan, collapsed): `plan` pairs each site with its (variant, url) probes in variant
+    order, leaving out variants whose URL normalizes to one already planned for that site;
+    `collapsed` counts the probes left out that way.
+    """
+    plan = []
+    collapsed = 0
+    for site in sites:
+        seen = set()
+        probes = []
+        plan.append((site, probes))
+        for variant in variants:
+            url = site.url_for(variant)
+            key = normalize_profile_url(url, site.case_sensitive)
+            if key in seen:
+                collapsed += 1
+                continue
+            seen.add(key)
+            probes.append((variant, url))
+    return plan, collapsed
+
+async def search_username_variants(variants, session=None, journal=None, sites=None, stop_on_hit=True, on_result=None):
+    """
+    Probes every variant on every site through the shared per-host scheduler. Each site works
+    through its planned variants in order; with `stop_on_hit` it stops at the first variant it
+    confirms exists, since the account is found. `on_result(variant, result)` is called with
+    each (site, url, status) as it arrives.
+    Returns ({variant: [(site, url, status), ...]}, stats).
+    """
+    session = session or get_session()
+    sites = sites or load_username_sites()
+    plan, collapsed = plan_variant_probes(variants, sites)
+    results = {variant: [] for variant in variants}
+    stats = {"variants": len(variants), "sites": len(sites), "planned": sum(len(probes) for _, probes in plan),
+             "collapsed": collapsed, "skipped": 0, "probed": 0, "hits": 0}
+
+    async def probe_site(site, probes):
+        for index, (variant, _) in enumerate(probes):
+            result = await journaled(journal, "username", variant, site.name,
+                                     lambda: check_username(session, site, variant))
+            stats["probed"] += 1
+            results[variant].append(result)
+            if on_result:
+                on_result(variant, result)
+            if result[2] is True:
+                stats["hits"] += 1
+                if stop_on_hit:
+                    stats["skipped"] += len(probes) - index - 1
+                    return
+
+    await asyncio.gather(*(probe_site(site, probes) for site, probes in plan))
+    return results, stats
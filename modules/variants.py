@@ -0,0 +1,46 @@
+import re
+
+SEPARATORS = ("", ".", "_", "-")
+LEET = str.maketrans({"a": "4", "e": "3", "i": "1", "o": "0", "s": "5", "t": "7"})
+DEFAULT_MAX_VARIANTS = 50
+
+SEPARATOR = re.compile(r"[^0-9A-Za-z]+")
+# Only well-formed camelCase is split into words, so "JohnSmith90" is John, Smith, 90 but "xXx" stays whole
+CAMEL_CASE = re.compile(r"(?:[A-Z][a-z]+|[a-z]{2,})(?:[A-Z][a-z]+)+\d*")
+CAMEL_TOKEN = re.compile(r"[A-Z]?[a-z]+|\d+")
+LETTERS_OR_DIGITS = re.compile(r"\D+|\d+")
+
+def split_username(username):
+    """Splits a username into its words and its trailing number, e.g. "john_smith90" -> (["john", "smith"], "90")."""
+    tokens = []
+    for chunk in SEPARATOR.split(username):
+        tokens += (CAMEL_TOKEN if CAMEL_CASE.fullmatch(chunk) else LETTERS_OR_DIGITS).findall(chunk)
+    number = tokens.pop() if tokens and tokens[-1].isdigit() else ""
+    return [token.lower() for token in tokens], number
+
+def _joined(words, number=""):
+    for separator in SEPARATORS:
+        yield separator.join(words) + number
+
+def generate_variants(username, years=(), leet=True, max_variants=DEFAULT_MAX_VARIANTS):
+    """
+    Returns candidate usernames, most likely first: the name as given, then its words re-joined
+    with each separator (and swapped when there are two), camelCase, leetspeak and the words
+    followed by each of `years` (four and two digits). At most `max_variants` are returned.
+    """
+    words, number = split_username(username)
+    candidates = [username, username.lower()]
+    if words:
+        candidates += _joined(words, number)
+        candidates.append("".join(word.capitalize() for word in words) + number)
+        if len(words) == 2:
+            candidates += _joined(words[::-1], number)
+        if number:
+            # The number is often a birth year or a counter the person dropped elsewhere
+            candidates += _joined(words)
+        if leet:
+            candidates += (variant.translate(LEET) for variant in list(_joined(words, number)))
+        for year in years:
+            for suffix in (str(year), str(year)[-2:]):
+                candidates += (variant + suffix for variant in ("".join(words), "_".join(words), ".".join(words)))
+    return list(dict.fromkeys(candidate for candidate in candidates if candidate))[:max_variants]
@@ -0,0 +1,302 @@
+import asyncio
+import re
+import time
+import weakref
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import aiohttp
+
+from modules.http_client import get_session
+from modules.ratelimit import HostScheduler, TokenBucket, RateLimitedError
+from modules.settings import get_settings
+
+RDAP_BOOTSTRAP_URL = "https://data.iana.org/rdap/dns.json"
+IANA_WHOIS_SERVER = "whois.iana.org"
+WHOIS_PORT = 43
+QUERY_TIMEOUT = 15
+MAX_RESPONSE_BYTES = 1 << 20
+
+# Registries ban clients that hammer them; these are deliberately conservative per-server rates
+RDAP_RATE_PER_SERVER = 2
+WHOIS_RATE_PER_SERVER = 1
+
+CACHE_TTL = 86400
+
+# Public suffixes with more than one label that registrars sell under. Names are only
+# reduced to "label + suffix", so an entry missing here just costs an extra cache entry.
+MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "me.uk", "ltd.uk", "plc.uk", "net.uk", "ac.uk", "gov.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au", "co.nz", "org.nz", "net.nz",
+    "co.jp", "ne.jp", "or.jp", "ac.jp", "co.kr", "or.kr", "com.br", "net.br", "org.br",
+    "com.cn", "net.cn", "org.cn", "com.tr", "net.tr", "org.tr", "gen.tr", "com.mx", "org.mx",
+    "co.in", "net.in", "org.in", "co.za", "org.za", "com.ar", "com.sg", "com.hk", "com.tw",
+    "co.il", "org.il", "com.ua", "com.pl", "com.ru", "co.id", "com.my", "com.ph", "com.vn",
+}
+
+# WHOIS labels vary by registry; the first label found in a response wins
+WHOIS_FIELDS = {
+    "registrar": ("registrar", "sponsoring registrar", "registrar name", "registrar organization"),
+    "created": ("creation date", "created on", "created", "registration time", "registered on", "registered"),
+    "updated": ("updated date", "last updated on", "last-update", "last modified", "changed"),
+    "expires": ("registry expiry date", "registrar registration expiration date", "expiration date",
+                "expiry date", "expires on", "expire date", "paid-till", "expires"),
+    "registrant": ("registrant organization", "registrant organisation", "registrant name", "registrant", "org"),
+    "dnssec": ("dnssec",),
+}
+WHOIS_LIST_FIELDS = {
+    "name_servers": ("name server", "nserver", "nameservers", "name servers"),
+    "status": ("domain status", "status", "state"),
+}
+REFERRAL_FIELDS = ("registrar whois server", "whois server", "referralserver", "refer", "whois")
+WHOIS_LINE = re.compile(r"^\s*([^:\n]{2,60}?)\s*:\s*(.*?)\s*$")
+NO_MATCH = re.compile(r"no match|not found|no data found|no entries found|status:\s*free|domain not found", re.IGNORECASE)
+
+class WhoisError(Exception):
+    """Raised when no registry answered for a domain."""
+
+class _Abandoned(Exception):
+    """Set on a shared lookup whose owner was cancelled, so its waiters send their own instead."""
+
+def registrable_domain(name):
+    """Reduces a host name to the domain a registry holds a record for (e.g. a.b.example.co.uk -> example.co.uk)."""
+    labels = name.lower().strip().rstrip(".").encode("idna").decode("ascii").split(".")
+    if len(labels) >= 3 and ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+def parse_whois(text):
+    """Extracts the common fields from a WHOIS response."""
+    record = {key: None for key in WHOIS_FIELDS}
+    record.update({key: [] for key in WHOIS_LIST_FIELDS})
+    labels = {label: key for key, names in WHOIS_FIELDS.items() for label in names}
+    list_labels = {label: key for key, names in WHOIS_LIST_FIELDS.items() for label in names}
+    for line in text.splitlines():
+        if line.lstrip().startswith(("%", "#", ">>>")):
+            continue
+        match = WHOIS_LINE.match(line)
+        if not match or not match.group(2):
+            continue
+        label, value = match.group(1).lower(), match.group(2)
+        if label in labels and record[labels[label]] is None:
+            record[labels[label]] = value
+        elif label in list_labels:
+            # Status lines often carry an explanatory URL after the code
+            value = value.split()[0] if list_labels[label] == "status" else value.lower().rstrip(".")
+            if value not in record[list_labels[label]]:
+                record[list_labels[label]].append(value)
+    return record
+
+def _referral(text):
+    for line in text.splitlines():
+        match = WHOIS_LINE.match(line)
+        if match and match.group(1).lower() in REFERRAL_FIELDS and match.group(2):
+            server = match.group(2).split("://")[-1].strip("/").split(":")[0]
+            if server:
+                return server.lower()
+    return None
+
+def _vcard_name(entity):
+    for entry in (entity.get("vcardArray") or [None, []])[1]:
+        if entry and entry[0] in ("fn", "org") and entry[3]:
+            return entry[3] if isinstance(entry[3], str) else " ".join(entry[3])
+    return None
+
+def parse_rdap(data):
+    """Extracts the same fields as parse_whois from an RDAP domain object."""
+    events = {event.get("eventAction"): event.get("eventDate") for event in data.get("events", [])}
+    record = {
+        "registrar": None,
+        "created": events.get("registration"),
+        "updated": events.get("last changed"),
+        "expires": events.get("expiration"),
+        "registrant": None,
+        "dnssec": None,
+        "name_servers": [ns.get("ldhName", "").lower().rstrip(".") for ns in data.get("nameservers", []) if ns.get("ldhName")],
+        "status": list(data.get("status", [])),
+    }
+    if "secureDNS" in data:
+        record["dnssec"] = "signed" if data["secureDNS"].get("delegationSigned") else "unsigned"
+    for entity in data.get("entities", []):
+        roles = entity.get("roles", [])
+        if "registrar" in roles and not record["registrar"]:
+            record["registrar"] = _vcard_name(entity)
+        elif "registrant" in roles and not record["registrant"]:
+            record["registrant"] = _vcard_name(entity)
+    return record
+
+class WhoisClient:
+    """
+    Looks up registration records, preferring RDAP and falling back to WHOIS on port 43.
+    Each TLD is routed once (IANA RDAP bootstrap, then whois.iana.org referrals) and the
+    route is reused. Queries are paced per server, identical lookups in flight share one
+    query, and parsed records are cached by registrable domain.
+    """
+
+    def __init__(self, cache_ttl=CACHE_TTL, max_entries=None):
+        self.cache_ttl = cache_ttl
+        self._max_entries = max_entries
+        self.rdap_routes = None # tld -> RDAP base URL, from the IANA bootstrap
+        self.whois_routes = {} # tld -> WHOIS server
+        self._cache = OrderedDict() # registrable domain -> (expires, record)
+        self._inflight = {}
+        # Pacing state holds asyncio primitives, so there is one set per event loop
+        self._loops = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = SimpleNamespace(
+                rdap=HostScheduler(host_rate=RDAP_RATE_PER_SERVER),
+                buckets={}, # WHOIS server -> TokenBucket
+                bootstrap_lock=asyncio.Lock(),
+            )
+        return state
+
+    async def _load_bootstrap(self):
+        if self.rdap_routes is not None:
+            return
+        async with self._state().bootstrap_lock:
+            if self.rdap_routes is not None:
+                return
+            routes = {}
+            try:
+                async with get_session().get(RDAP_BOOTSTRAP_URL, timeout=QUERY_TIMEOUT) as response:
+                    bootstrap = await response.json(content_type=None)
+                for tlds, urls in bootstrap.get("services", []):
+                    # Prefer https endpoints when a registry lists several
+                    url = sorted(urls, key=lambda u: not u.startswith("https"))[0]
+                    for tld in tlds:
+                        routes[tld.lower()] = url if url.endswith("/") else url + "/"
+            except Exception:
+                pass # Without the bootstrap every TLD goes through WHOIS
+            self.rdap_routes = routes
+
+    async def _query_whois(self, server, query):
+        buckets = self._state().buckets
+        bucket = buckets.get(server)
+        if bucket is None:
+            bucket = buckets[server] = TokenBucket(WHOIS_RATE_PER_SERVER)
+        await bucket.acquire()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(server, WHOIS_PORT), QUERY_TIMEOUT)
+        try:
+            writer.write(f"{query}\r\n".encode())
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(MAX_RESPONSE_BYTES), QUERY_TIMEOUT)
+            # Servers close the connection when done; read until then, but no more than MAX_RESPONSE_BYTES
+            chunks = [data]
+            received = len(data)
+            while data and received < MAX_RESPONSE_BYTES:
+                data = await asyncio.wait_for(reader.read(MAX_RESPONSE_BYTES - received), QUERY_TIMEOUT)
+                chunks.append(data)
+                received += len(data)
+            return b"".join(chunks).decode("utf-8", errors="replace")
+        finally:
+            writer.close()
+
+    async def _whois_server(self, tld):
+        server = self.whois_routes.get(tld)
+        if server is None:
+            server = _referral(await self._query_whois(IANA_WHOIS_SERVER, tld))
+            if server is None:
+                raise WhoisError(f"No WHOIS server known for .{tld}")
+            self.whois_routes[tld] = server
+        return server
+
+    async def _lookup_rdap(self, domain, base):
+        async def handle(response):
+            if response.status == 404:
+                return None
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+        data = await self._state().rdap.request(get_session(), "GET", f"{base}domain/{domain}", handle,
+                                                    timeout=QUERY_TIMEOUT, headers={"Accept": "application/rdap+json"})
+        if data is None:
+            return {"domain": domain, "source": "rdap", "server": base, "registered": False}
+        return {"domain": domain, "source": "rdap", "server": base, "registered": True, **parse_rdap(data)}
+
+    async def _lookup_whois(self, domain, tld):
+        server = await self._whois_server(tld)
+        text = await self._query_whois(server, domain)
+        record = parse_whois(text)
+        # Thin registries only point at the registrar's server, which holds the full record
+        referral = _referral(text)
+        if referral and referral != server:
+            try:
+                referred = await self._query_whois(referral, domain)
+                record.update({key: value for key, value in parse_whois(referred).items() if value})
+                server, text = referral, referred
+            except (OSError, asyncio.TimeoutError):
+                pass
+        registered = not NO_MATCH.search(text[:2000]) or bool(record["created"] or record["name_servers"])
+        return {"domain": domain, "source": "whois", "server": server, "registered": registered, **record, "raw": text}
+
+    async def _lookup(self, domain):
+        tld = domain.rsplit(".", 1)[-1]
+        await self._load_bootstrap()
+        base = self.rdap_routes.get(tld)
+        if base:
+            try:
+                return await self._lookup_rdap(domain, base)
+            except (RateLimitedError, aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+                rdap_error = e # Fall through to WHOIS, which many registries still run
+        else:
+            rdap_error = None
+        try:
+            return await self._lookup_whois(domain, tld)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise WhoisError(f"RDAP: {rdap_error}; WHOIS: {e}" if rdap_error else str(e) or type(e).__name__) from None
+
+    async def lookup(self, name):
+        """Returns the parsed registration record for the domain `name` belongs to."""
+        domain = registrable_domain(name)
+        entry = self._cache.get(domain)
+        if entry and entry[0] > time.monotonic():
+            self._cache.move_to_end(domain)
+            self.hits += 1
+            return entry[1]
+
+        loop = asyncio.get_running_loop()
+        pending = self._inflight.get(domain)
+        if pending is not None and pending.get_loop() is loop:
+            self.hits += 1
+            try:
+                return await asyncio.shield(pending)
+            except _Abandoned:
+                return await self.lookup(name)
+
+        self.misses += 1
+        future = loop.create_future()
+        self._inflight[domain] = future
+        try:
+            record = await self._lookup(domain)
+            self._cache[domain] = (time.monotonic() + self.cache_ttl, record)
+            self._cache.move_to_end(domain)
+            max_entries = self._max_entries or get_settings().whois_cache_entries
+            while len(self._cache) > max_entries:
+                self._cache.popitem(last=False)
+            future.set_result(record)
+            return record
+        except asyncio.CancelledError:
+            # Only the owner was cancelled; the waiters still want an answer
+            future.set_exception(_Abandoned())
+            raise
+        except Exception as e:
+            # Failures are not cached; the next lookup tries again
+            future.set_exception(e)
+            raise
+        finally:
+            if self._inflight.get(domain) is future:
+                del self._inflight[domain]
+            # Nobody else awaited it; keep asyncio from warning about an unretrieved exception
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+whois_client = WhoisClient()